@@ -0,0 +1,39 @@
+import math
+import time
+
+from TelemetryStore import RingBuffer
+
+
+class AdaptiveTimeout:
+    def __init__(self, default_timeout: float, timeout_policy: dict|None) -> None:
+        timeout_policy = timeout_policy or {}
+        self.default_timeout = default_timeout
+        self.min_timeout = timeout_policy.get("min_timeout", default_timeout)
+        self.max_timeout = timeout_policy.get("max_timeout", default_timeout)
+        self._percentile = timeout_policy.get("percentile", 0.99)
+        self._multiplier = timeout_policy.get("multiplier", 2.0)
+        self._min_samples = timeout_policy.get("min_samples", 16)
+        self._window = timeout_policy.get("window", 128)
+        self._latencies: dict[str, RingBuffer] = {}
+
+    def _key(self, command: str) -> str:
+        parts = command.split("^")
+        return f"{parts[0]}/{len(parts)}"
+
+    def observe(self, command: str, latency: float) -> None:
+        key = self._key(command)
+        latencies = self._latencies.get(key)
+        if latencies is None:
+            latencies = self._latencies.setdefault(key, RingBuffer(self._window))
+        latencies.append(time.time(), latency)
+
+    def deadline(self, command: str) -> float:
+        latencies = self._latencies.get(self._key(command))
+        if latencies is None or len(latencies) < self._min_samples:
+            return self.default_timeout
+
+        _, values = latencies.snapshot()
+        ordered = sorted(values)
+        index = min(len(ordered) - 1, math.ceil(self._percentile * len(ordered)) - 1)
+        deadline = ordered[index] * self._multiplier
+        return max(self.min_timeout, min(self.max_timeout, deadline))
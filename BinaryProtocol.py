@@ -0,0 +1,53 @@
+import struct
+from enum import IntEnum
+
+from exceptions.BadFrameError import BadFrameError
+
+
+class Opcode(IntEnum):
+    START = 1
+    PUMP = 2
+    CLOSE = 3
+    TEXT = 4
+
+
+class BinaryProtocol:
+    NEGOTIATION_COMMAND = "binary"
+    NEGOTIATION_REPLY = "Binary protocol enabled"
+    NOTICE_REQUEST_ID = 0
+    MAX_FRAME_LENGTH = 65536
+
+    LENGTH = struct.Struct("!I")
+    REQUEST_HEADER = struct.Struct("!IHB")
+    REPLY_HEADER = struct.Struct("!IB")
+    PORT_ID = struct.Struct("!H")
+    MAX_REPLY_PAYLOAD = MAX_FRAME_LENGTH - REPLY_HEADER.size
+
+    @classmethod
+    def encode_request(cls, request_id: int, port_id: int, opcode: Opcode, payload: bytes = b"") -> bytes:
+        return cls.LENGTH.pack(cls.REQUEST_HEADER.size + len(payload)) + cls.REQUEST_HEADER.pack(request_id, port_id, opcode) + payload
+
+    @classmethod
+    def encode_reply(cls, request_id: int, status: int, payload: bytes = b"") -> bytes:
+        return cls.LENGTH.pack(cls.REPLY_HEADER.size + len(payload)) + cls.REPLY_HEADER.pack(request_id, status) + payload
+
+    @classmethod
+    def split_frame(cls, buffer: bytes, offset: int, header: struct.Struct) -> tuple[tuple, bytes, int]|None:
+        if len(buffer) - offset < cls.LENGTH.size:
+            return None
+        (length,) = cls.LENGTH.unpack_from(buffer, offset)
+        if length < header.size or length > cls.MAX_FRAME_LENGTH:
+            raise BadFrameError(f"Bad binary frame length. Length: {length}")
+        end = offset + cls.LENGTH.size + length
+        if len(buffer) < end:
+            return None
+        fields = header.unpack_from(buffer, offset + cls.LENGTH.size)
+        return fields, buffer[offset + cls.LENGTH.size + header.size:end], end
+
+    @classmethod
+    def split_request(cls, buffer: bytes, offset: int = 0) -> tuple[tuple[int, int, int], bytes, int]|None:
+        return cls.split_frame(buffer, offset, cls.REQUEST_HEADER)
+
+    @classmethod
+    def split_reply(cls, buffer: bytes, offset: int = 0) -> tuple[tuple[int, int], bytes, int]|None:
+        return cls.split_frame(buffer, offset, cls.REPLY_HEADER)
@@ -0,0 +1,145 @@
+import collections
+import logging
+import socket
+import threading
+
+
+class ClientConnection:
+    MAX_PORT_ID = 65535
+
+    def __init__(self, clientsocket: socket.socket, address: tuple, logger: logging.Logger, output_config: dict) -> None:
+        self.socket = clientsocket
+        self.address = address
+        self.buffer = b""
+        self.binary = False
+        self._logger = logger
+        self._port_ids: dict[str, int] = {}
+        self._ports: list[str] = []
+
+        self._max_buffered_bytes: int = output_config.get("max_buffered_bytes", 1048576)
+        self._high_watermark: int = output_config.get("high_watermark", 262144)
+        self._backpressure_timeout: float = output_config.get("backpressure_timeout", 10)
+        self._max_batch_bytes: int = output_config.get("max_batch_bytes", 65536)
+        self._max_in_flight: int = output_config.get("max_in_flight", 64)
+
+        self._outbound: collections.deque[bytes] = collections.deque()
+        self._buffered = 0
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name=f"ClientWriter{address}", daemon=True)
+        self._writer.start()
+
+    def is_closed(self) -> bool:
+        return self._closed
+
+    def intern_port(self, port: str) -> int|None:
+        with self._condition:
+            port_id = self._port_ids.get(port)
+            if port_id is None:
+                if len(self._ports) >= self.MAX_PORT_ID:
+                    return None
+                self._ports.append(port)
+                port_id = len(self._ports)
+                self._port_ids[port] = port_id
+            return port_id
+
+    def port_name(self, port_id: int) -> str|None:
+        with self._condition:
+            if 0 < port_id <= len(self._ports):
+                return self._ports[port_id - 1]
+        return None
+
+    def send(self, data: bytes) -> bool:
+        with self._condition:
+            if self._closed:
+                return False
+            if self._buffered + len(data) > self._max_buffered_bytes:
+                self._logger.error(f"Client output buffer overflow. Disconnecting client {self.address}")
+                self._close_locked()
+                return False
+            self._outbound.append(data)
+            self._buffered += len(data)
+            self._condition.notify_all()
+        return True
+
+    def wait_for_capacity(self) -> bool:
+        with self._condition:
+            has_capacity = self._condition.wait_for(
+                lambda: self._closed or self._buffered <= self._high_watermark, self._backpressure_timeout
+            )
+            if self._closed:
+                return False
+            if not has_capacity:
+                self._logger.error(f"Client does not read replies. Disconnecting client {self.address}")
+                self._close_locked()
+                return False
+        return True
+
+    def begin_request(self) -> bool:
+        with self._condition:
+            self._condition.wait_for(lambda: self._closed or self._in_flight < self._max_in_flight)
+            if self._closed:
+                return False
+            self._in_flight += 1
+        return True
+
+    def end_request(self) -> None:
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def _next_batch(self) -> bytes|None:
+        with self._condition:
+            self._condition.wait_for(lambda: self._closed or self._outbound)
+            if self._closed:
+                return None
+            batch = [self._outbound.popleft()]
+            size = len(batch[0])
+            while self._outbound and size + len(self._outbound[0]) <= self._max_batch_bytes:
+                size += len(self._outbound[0])
+                batch.append(self._outbound.popleft())
+        return b"".join(batch)
+
+    def _write_loop(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            view = memoryview(batch)
+            while view:
+                try:
+                    sent = self.socket.send(view)
+                except OSError:
+                    sent = 0
+                if sent == 0:
+                    self._logger.info(f"Connection broken. Client {self.address}")
+                    self.close()
+                    return
+                view = view[sent:]
+            with self._condition:
+                self._buffered -= len(batch)
+                self._condition.notify_all()
+
+    def flush(self, timeout: float|None = None) -> None:
+        with self._condition:
+            self._condition.wait_for(lambda: self._closed or self._buffered == 0, timeout)
+
+    def _close_locked(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._outbound.clear()
+        self._condition.notify_all()
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            ...
+
+    def close(self) -> None:
+        with self._condition:
+            self._close_locked()
+        self.socket.close()
+
+    def __repr__(self):
+        return f"ClientConnection: {self.address}"
@@ -0,0 +1,157 @@
+import re
+
+from crc import Calculator, Configuration
+
+from exceptions.ArgumentError import ArgumentError
+from exceptions.ConfigError import ConfigError
+
+
+class CommandGrammar:
+    def __init__(self, command_set: dict, arguments: dict, crc_config: dict|None, previous: "CommandGrammar|None" = None) -> None:
+        self.command_set = command_set
+        self.arguments = arguments
+        self.crc_config = crc_config
+        self.recompiled_commands: list[str] = []
+        self.recompiled_arguments: list[str] = []
+
+        self._argument_patterns: dict[str, re.Pattern] = {}
+        self._command_patterns: dict[str, list[re.Pattern]] = {}
+        self._patterns_by_length: dict[int, list[tuple[str, list[re.Pattern]]]] = {}
+
+        for command in command_set:
+            patterns = self._compile_command(command, previous)
+            self._command_patterns[command] = patterns
+            self._patterns_by_length.setdefault(len(patterns), []).append((command, patterns))
+
+        if previous is not None and previous.crc_config == crc_config:
+            self.calculator = previous.calculator
+        elif crc_config is not None:
+            self.calculator = Calculator(Configuration(**crc_config))
+        else:
+            self.calculator = None
+
+        self.numeric_fields = self._create_numeric_fields()
+
+    def _create_possible_values(self, argument: str, argument_meta: dict) -> str:
+        if isinstance(argument_meta['values'], list):
+            return r"|".join(argument_meta['values'])
+
+        float_pattern = r"float\((?P<length>\d+)(,(?P<decimal>\d))?\)(,(?P<OffValue>OFF))?"
+        int_pattern = r"int\((?P<length>\d+)\)(,(?P<OffValue>OFF))?"
+        str_pattern = r"str\((?P<length>\d+)\)(,(?P<OffValue>OFF))?"
+        datetime_pattern = r"DateAndTimeStamp"
+        date_pattern = r"DateStamp"
+        duration_pattern = r"DurationStamp"
+        own_re_pattern = r"re\((?P<pattern>.+)\)"
+
+        match = re.match(float_pattern, argument_meta['values'])
+        if match is not None:
+            length = match.group("length")
+            decimal = match.groupdict().get("decimal")
+            decimal = decimal if decimal is not None else "1"
+            off_value = match.groupdict().get("OffValue") is not None
+            result = r"(?=.{1,length}$)\d+\.\d{decimal,}".replace("length", length).replace("decimal", decimal)
+            result = rf"{result}|OFF" if off_value else result
+            return result
+
+        match = re.match(int_pattern, argument_meta['values'])
+        if match is not None:
+            length = match.group("length")
+            off_value = match.groupdict().get("OffValue") is not None
+            result = r"\d{1,length}".replace("length", length)
+            result = rf"{result}|OFF" if off_value else result
+            return result
+
+        match = re.match(str_pattern, argument_meta['values'])
+        if match is not None:
+            length = match.group("length")
+            off_value = match.groupdict().get("OffValue") is not None
+            result = r"[^\^]{1,length}".replace("length", length)
+            result = rf"{result}|OFF" if off_value else result
+            return result
+
+        match = re.match(datetime_pattern, argument_meta['values'])
+        if match is not None:
+            return r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}'
+
+        match = re.match(date_pattern, argument_meta['values'])
+        if match is not None:
+            return r'\d{4}-\d{2}-\d{2}'
+
+        match = re.match(duration_pattern, argument_meta['values'])
+        if match is not None:
+            return r'\d{2}:\d{2}:\d{2}|24h\+'
+
+        match = re.match(own_re_pattern, argument_meta['values'])
+        if match is not None:
+            return match.group("pattern")
+
+        raise ArgumentError(f"Bad values provided for argument. Must be int(length), float(length,decimal_places), str(max_chars_length), DateAndTimeStamp(ISO 8601), DurationStamp(ISO 8601), DateStamp(ISO 8601), own regex pattern i.e. re(my_pattern) or list. Argument: {argument}")
+
+    def _compile_argument(self, argument: str, argument_meta: dict, previous: "CommandGrammar|None") -> re.Pattern:
+        pattern = self._argument_patterns.get(argument)
+        if pattern is not None:
+            return pattern
+
+        if previous is not None and argument in previous._argument_patterns and previous.arguments.get(argument) == argument_meta:
+            pattern = previous._argument_patterns[argument]
+        else:
+            possible_values = self._create_possible_values(argument, argument_meta)
+            try:
+                pattern = re.compile(rf"^{possible_values}$")
+            except re.error as exc:
+                raise ArgumentError(f"Bad regex pattern provided for argument. {exc}. Argument: {argument}")
+            self.recompiled_arguments.append(argument)
+
+        self._argument_patterns[argument] = pattern
+        return pattern
+
+    def _compile_command(self, command: str, previous: "CommandGrammar|None") -> list[re.Pattern]:
+        parts = command.split("^")
+
+        patterns = []
+        for part in parts[1:]:
+            if not part.startswith("<") and not part.endswith(">"):
+                raise ConfigError(
+                    f"Argument badly described in command template in config.json. Should be '<ARGUMENT_NAME>' Command: {command}"
+                )
+            argument_meta = self.arguments.get(part)
+            if argument_meta is None:
+                raise ConfigError(
+                    f"Provided argument from command is not described in arguments part in config.json. Command: {command}"
+                )
+            patterns.append(self._compile_argument(part, argument_meta, previous))
+
+        reused = previous._command_patterns.get(command) if previous is not None else None
+        if reused is not None and all(old is new for old, new in zip(reused[1:], patterns)):
+            return reused
+
+        try:
+            patterns.insert(0, re.compile(parts[0]))
+        except re.error as exc:
+            raise ConfigError(f"Bad command name in command template in config.json. {exc}. Command: {command}")
+        self.recompiled_commands.append(command)
+        return patterns
+
+    def _create_numeric_fields(self) -> dict[tuple[str, int], list[tuple[int, str]]]:
+        numeric_fields = {}
+        for description in self.command_set.values():
+            parts = description['response'].split("^")
+            fields = []
+            for index, part in enumerate(parts[1:], start=1):
+                values = self.arguments.get(part, {}).get('values')
+                if isinstance(values, str) and re.match(r"(float|int)\(", values):
+                    fields.append((index, f"{parts[0]}.{part.strip('<>')}"))
+            if fields:
+                numeric_fields[(parts[0], len(parts))] = fields
+        return numeric_fields
+
+    def match(self, passed_command: str) -> str|None:
+        parts = passed_command.split("^")
+        for command, patterns in self._patterns_by_length.get(len(parts), []):
+            if all(pattern.match(part) for pattern, part in zip(patterns, parts)):
+                return command
+        return None
+
+    def response_name(self, command: str) -> str:
+        return self.command_set[command]['response'].split("^")[0]
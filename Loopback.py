@@ -11,6 +11,7 @@ class Loopback:
         self._commands = command_set
         self._arguments = arguments
         self._parameters = {}
+        self.timeout = None
         
         self._packet_terminator = "0D"
         self._response = self._set_default_response()
@@ -20,6 +21,14 @@ class Loopback:
         else:
             self.calculator = None
             
+    def reload(self, command_set: dict, arguments: dict, crc_config: dict|None) -> None:
+        self._commands = command_set
+        self._arguments = arguments
+        if crc_config is not None:
+            self.calculator = Calculator(self._get_crc_config(crc_config))
+        else:
+            self.calculator = None
+            
     def _set_default_response(self):
         return bytes(self._packet_terminator, encoding="utf-8")
         
@@ -170,9 +179,15 @@ class Loopback:
         finally:
             self._response = self._set_default_response()
             
+    def reset_input_buffer(self) -> None:
+        ...
+            
     def cancel_read(self):
         ...
     
+    def open(self) -> None:
+        ...
+    
     def close(self) -> None:
         ...
         
\ No newline at end of file
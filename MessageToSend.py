@@ -1,8 +1,20 @@
+import threading
+
+
 class MessageToSend:
     def __init__(self, command: str, time: int):
         self.command: str = command
         self.time: int = time
+        self.response: str|None = None
+        self._answered = threading.Event()
+
+    def answer(self, response: str) -> None:
+        self.response = response
+        self._answered.set()
+
+    def wait_response(self) -> str:
+        self._answered.wait()
+        return self.response
 
     def __repr__(self):
-        return self.command
-    
\ No newline at end of file
+        return self.command
\ No newline at end of file
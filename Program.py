@@ -0,0 +1,56 @@
+import threading
+from typing import Callable
+
+from TimerWheel import Timer
+
+
+class ProgramStep:
+    def __init__(self, offset: float, command: str, period: float|None = None, count: int|None = None) -> None:
+        self.offset = offset
+        self.command = command
+        self.period = period
+        self.remaining: int|None = count if period is not None else 1
+        self.next_fire: float|None = None
+        self.timer: Timer|None = None
+        self.paused_remaining: float|None = None
+        self.queued = False
+
+    def __repr__(self):
+        return self.command
+
+
+class Program:
+    RUNNING = "RUNNING"
+    PAUSED = "PAUSED"
+    CANCELLED = "CANCELLED"
+    FINISHED = "FINISHED"
+
+    def __init__(self, name: str, port: str, steps: list[ProgramStep], notify: Callable[[str], None]) -> None:
+        self.name = name
+        self.port = port
+        self.steps = steps
+        self.notify = notify
+        self.state = self.RUNNING
+        self.executed = 0
+        self.skipped = 0
+        self.in_flight = 0
+        self.last_reply = ""
+        self.lock = threading.Lock()
+        if any(step.remaining is None for step in steps):
+            self.total: int|None = None
+        else:
+            self.total = sum(step.remaining for step in steps)
+
+    def is_active(self) -> bool:
+        return self.state in (self.RUNNING, self.PAUSED)
+
+    def is_complete(self) -> bool:
+        return self.in_flight == 0 and all(step.remaining == 0 for step in self.steps)
+
+    def progress(self) -> str:
+        total = "-" if self.total is None else self.total
+        skipped = f" skipped {self.skipped}" if self.skipped else ""
+        return f"PROGRAM {self.name} {self.port} {self.state} {self.executed}/{total}{skipped}"
+
+    def __repr__(self):
+        return f"Program: {self.name}"
@@ -0,0 +1,206 @@
+import collections
+import logging
+import re
+import threading
+import time
+import traceback
+from multiprocessing.pool import ThreadPool
+from typing import Callable
+
+from Program import Program, ProgramStep
+from ReplyStatus import ReplyStatus
+from TimerWheel import Timer, TimerWheel
+from exceptions.ProgramError import ProgramError
+
+
+class ProgramScheduler:
+    STEP_PATTERN = re.compile(
+        r"(?P<offset>\d+(\.\d+)?)(/(?P<period>\d+(\.\d+)?)(x(?P<count>\d+))?)?:(?P<command>.+)$"
+    )
+
+    def __init__(self, logger: logging.Logger, execute: Callable[[str, str, float], list[tuple[str, int, ReplyStatus]]], max_pumps: int) -> None:
+        self._logger = logger
+        self._execute = execute
+        self._pool = ThreadPool(processes=max_pumps)
+        self._port_queues: dict[str, collections.deque[tuple[Program, ProgramStep, float]]] = {}
+        self._programs: dict[str, Program] = {}
+        self._lock = threading.Lock()
+        self._wheel = TimerWheel(logger)
+        self._wheel.start()
+
+    def parse_steps(self, steps: str) -> list[ProgramStep]:
+        parsed = []
+        for step in steps.split(";"):
+            match = self.STEP_PATTERN.match(step)
+            if match is None:
+                raise ProgramError(
+                    f"Bad program step. Must be OFFSET:COMMAND or OFFSET/PERIOD[xCOUNT]:COMMAND with times in seconds. Step: {step}"
+                )
+            period = match.group("period")
+            count = match.group("count")
+            if period is not None and float(period) <= 0:
+                raise ProgramError(f"Program step period has to be positive. Step: {step}")
+            if count is not None and int(count) == 0:
+                raise ProgramError(f"Program step count has to be positive. Step: {step}")
+            parsed.append(ProgramStep(
+                offset=float(match.group("offset")),
+                command=match.group("command"),
+                period=float(period) if period is not None else None,
+                count=int(count) if count is not None else None
+            ))
+        return parsed
+
+    def _schedule(self, program: Program, step: ProgramStep, deadline: float) -> None:
+        step.next_fire = deadline
+        step.timer = self._wheel.schedule(deadline, lambda timer: self._fire(program, step, timer))
+
+    def _fire(self, program: Program, step: ProgramStep, timer: Timer) -> None:
+        with program.lock:
+            if program.state != Program.RUNNING or step.timer is not timer:
+                return
+            step.timer = None
+            if step.remaining is not None:
+                step.remaining -= 1
+            if step.remaining != 0:
+                self._schedule(program, step, timer.deadline + step.period)
+            if step.queued:
+                program.skipped += 1
+                self._logger.warning(f"Program step still queued, skipping this run. Program {program.name}, step {step.command}")
+                return
+            step.queued = True
+            program.in_flight += 1
+
+        time_signature = time.time() - (time.monotonic() - timer.deadline)
+        self._dispatch(program, step, time_signature)
+
+    def _dispatch(self, program: Program, step: ProgramStep, time_signature: float) -> None:
+        with self._lock:
+            queue = self._port_queues.get(program.port)
+            if queue is not None:
+                queue.append((program, step, time_signature))
+                return
+            self._port_queues[program.port] = collections.deque([(program, step, time_signature)])
+        self._pool.apply_async(self._drain, (program.port,))
+
+    def _drain(self, port: str) -> None:
+        while True:
+            with self._lock:
+                queue = self._port_queues[port]
+                if not queue:
+                    del self._port_queues[port]
+                    return
+                program, step, time_signature = queue.popleft()
+            try:
+                self._run_step(program, step, time_signature)
+            except Exception:
+                self._logger.error(traceback.format_exc())
+
+    def _run_step(self, program: Program, step: ProgramStep, time_signature: float) -> None:
+        with program.lock:
+            step.queued = False
+            if program.state != Program.RUNNING:
+                program.in_flight -= 1
+                program.skipped += 1
+                return
+
+        try:
+            replies = self._execute(program.port, step.command, time_signature)
+        except Exception as exc:
+            replies = [(f"ERROR: {exc}", logging.ERROR, ReplyStatus.SERVER_ERROR)]
+        reply = " ".join(message for message, _, _ in replies)
+
+        with program.lock:
+            program.executed += 1
+            program.in_flight -= 1
+            program.last_reply = reply
+            finished = program.state == Program.RUNNING and program.is_complete()
+            if finished:
+                program.state = Program.FINISHED
+            progress = program.progress()
+
+        program.notify(f"{progress} {step.command}: {reply}")
+        if finished:
+            self._logger.info(f"Program finished. Program {program.name}")
+
+    def create(self, name: str, port: str, steps: str, notify: Callable[[str], None]) -> list[tuple[str, int, ReplyStatus]]:
+        try:
+            parsed = self.parse_steps(steps)
+        except ProgramError as exc:
+            return [(str(exc), logging.INFO, ReplyStatus.BAD_REQUEST)]
+
+        with self._lock:
+            existing = self._programs.get(name)
+            if existing is not None and existing.is_active():
+                return [(f"Program with this name is already running. Program {name}", logging.INFO, ReplyStatus.INVALID_STATE)]
+            program = Program(name, port, parsed, notify)
+            self._programs[name] = program
+
+        start = time.monotonic()
+        with program.lock:
+            for step in parsed:
+                self._schedule(program, step, start + step.offset)
+        return [(f"Program {name} scheduled for port {port}. Steps: {len(parsed)}", logging.INFO, ReplyStatus.OK)]
+
+    def pause(self, name: str) -> list[tuple[str, int, ReplyStatus]]:
+        program = self._programs.get(name)
+        if program is None:
+            return [(f"No program with this name. Program {name}", logging.INFO, ReplyStatus.NOT_FOUND)]
+
+        with program.lock:
+            if program.state != Program.RUNNING:
+                return [(f"Program is not running. {program.progress()}", logging.INFO, ReplyStatus.INVALID_STATE)]
+            program.state = Program.PAUSED
+            now = time.monotonic()
+            for step in program.steps:
+                if step.timer is not None:
+                    step.timer.cancel()
+                    step.timer = None
+                    step.paused_remaining = max(0.0, step.next_fire - now)
+            return [(program.progress(), logging.INFO, ReplyStatus.OK)]
+
+    def resume(self, name: str) -> list[tuple[str, int, ReplyStatus]]:
+        program = self._programs.get(name)
+        if program is None:
+            return [(f"No program with this name. Program {name}", logging.INFO, ReplyStatus.NOT_FOUND)]
+
+        with program.lock:
+            if program.state != Program.PAUSED:
+                return [(f"Program is not paused. {program.progress()}", logging.INFO, ReplyStatus.INVALID_STATE)]
+            program.state = Program.RUNNING
+            now = time.monotonic()
+            for step in program.steps:
+                if step.paused_remaining is not None:
+                    self._schedule(program, step, now + step.paused_remaining)
+                    step.paused_remaining = None
+            if program.is_complete():
+                program.state = Program.FINISHED
+            return [(program.progress(), logging.INFO, ReplyStatus.OK)]
+
+    def cancel(self, name: str) -> list[tuple[str, int, ReplyStatus]]:
+        program = self._programs.get(name)
+        if program is None:
+            return [(f"No program with this name. Program {name}", logging.INFO, ReplyStatus.NOT_FOUND)]
+
+        with program.lock:
+            if not program.is_active():
+                return [(f"Program is not active. {program.progress()}", logging.INFO, ReplyStatus.INVALID_STATE)]
+            program.state = Program.CANCELLED
+            for step in program.steps:
+                if step.timer is not None:
+                    step.timer.cancel()
+                    step.timer = None
+                step.paused_remaining = None
+            return [(program.progress(), logging.INFO, ReplyStatus.OK)]
+
+    def status(self, name: str) -> list[tuple[str, int, ReplyStatus]]:
+        program = self._programs.get(name)
+        if program is None:
+            return [(f"No program with this name. Program {name}", logging.INFO, ReplyStatus.NOT_FOUND)]
+
+        with program.lock:
+            last_reply = f" Last reply: {program.last_reply}" if program.last_reply else ""
+            return [(f"{program.progress()}.{last_reply}", logging.INFO, ReplyStatus.OK)]
+
+    def shutdown(self) -> None:
+        self._wheel.stop()
+        self._pool.close()
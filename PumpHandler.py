@@ -1,13 +1,14 @@
 import logging
-import re
 import threading
 import time
 import traceback
 import serial
-from crc import Calculator, Configuration
 
+from AdaptiveTimeout import AdaptiveTimeout
+from CommandGrammar import CommandGrammar
 from Loopback import Loopback
 from MessageToSend import MessageToSend
+from TelemetryStore import TelemetryStore
 from exceptions.ArgumentError import ArgumentError
 from exceptions.ChecksumError import ChecksumError
 from exceptions.CommandError import CommandError
@@ -17,110 +18,49 @@ from exceptions.NoResponseError import NoResponseError
 
 
 class PumpHandler:    
-    def __init__(self, port: str, pump: serial.Serial|Loopback, crc_config: dict|None, command_set: dict, arguments: dict) -> None:
+    def __init__(self, port: str, pump: serial.Serial|Loopback, crc_config: dict|None, command_set: dict, arguments: dict, telemetry: TelemetryStore|None = None, default_timeout: float = 3, timeout_policy: dict|None = None, retry_policy: dict|None = None, grammar: CommandGrammar|None = None) -> None:
         self.port = port    
         self.pump = pump
-        self._commands = command_set 
-        self._arguments = arguments
-        if crc_config is not None:
-            self.calculator = Calculator(self._get_crc_config(crc_config))
-        else:
-            self.calculator = None
+        self._grammar = grammar if grammar is not None else CommandGrammar(command_set, arguments, crc_config)
+        self._telemetry = telemetry
+        self._timeouts = AdaptiveTimeout(default_timeout, timeout_policy)
+        retry_policy = retry_policy or {}
+        self._retries: int = retry_policy.get("retries", 1)
+        self._backoff: float = retry_policy.get("backoff", 0.1)
+        self._backoff_factor: float = retry_policy.get("backoff_factor", 2)
+        self._reopen_attempts: int = retry_policy.get("reopen_attempts", 3)
         
         self.logger = logging.getLogger(f"Server.PumpHandler.{port}")
         self.logger.setLevel(logging.DEBUG)
         
         self._to_send_queue: list[MessageToSend] = []
-        self._response_queue: list[str] = []
+        self._queue_condition = threading.Condition()
         self._thread = threading.Thread(target=self._run, name=port)
         self._kill_thread: bool = False
         self._packet_terminator: str = "0D"
         
-    def _get_crc_config(self, crc_config: dict[str, int|bool]) -> Configuration:
-        return Configuration(**crc_config)
-    
     def _translate_to_hex(self, value: str) -> str:
         return str(hex(ord(value)).lstrip("0x")).upper()
     
     def _translate_from_hex(self, value: str) -> str:
         return str(chr(int(f"0x{value}", 16))).upper()
         
-    def _create_possible_values(self, argument: str, argument_meta: dict) -> str:
-        if isinstance(argument_meta['values'], list):
-            return r"|".join(argument_meta['values'])
-        
-        float_pattern = r"float\((?P<length>\d+)(,(?P<decimal>\d))?\)(,(?P<OffValue>OFF))?"
-        int_pattern = r"int\((?P<length>\d+)\)(,(?P<OffValue>OFF))?"
-        str_pattern = r"str\((?P<length>\d+)\)(,(?P<OffValue>OFF))?"
-        datetime_pattern = r"DateAndTimeStamp"
-        date_pattern = r"DateStamp"
-        duration_pattern = r"DurationStamp"
-        own_re_pattern = r"re\((?P<pattern>.+)\)"
-        
-        match = re.match(float_pattern, argument_meta['values'])
-        if match is not None:
-            length = match.group("length")
-            decimal = match.groupdict().get("decimal") 
-            decimal = decimal if decimal is not None else "1"
-            off_value = match.groupdict().get("OffValue") is not None
-            result = r"(?=.{1,length}$)\d+\.\d{decimal,}".replace("length", length).replace("decimal", decimal)
-            result = rf"{result}|OFF" if off_value else result
-            return result
-        
-        match = re.match(int_pattern, argument_meta['values'])
-        if match is not None:
-            length = match.group("length")
-            off_value = match.groupdict().get("OffValue") is not None
-            result = r"\d{1,length}".replace("length", length)
-            result = rf"{result}|OFF" if off_value else result
-            return result
-        
-        match = re.match(str_pattern, argument_meta['values'])
-        if match is not None:
-            length = match.group("length")
-            off_value = match.groupdict().get("OffValue") is not None
-            result = r"[^\^]{1,length}".replace("length", length)
-            result = rf"{result}|OFF" if off_value else result
-            return result
-        
-        match = re.match(datetime_pattern, argument_meta['values'])
-        if match is not None:
-            return r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}'
-        
-        match = re.match(date_pattern, argument_meta['values'])
-        if match is not None:
-            return r'\d{4}-\d{2}-\d{2}'
-        
-        match = re.match(duration_pattern, argument_meta['values'])
-        if match is not None:
-            return r'\d{2}:\d{2}:\d{2}|24h\+'
-        
-        match = re.match(own_re_pattern, argument_meta['values'])
-        if match is not None:
-            return match.group("pattern")
-        
-        raise ArgumentError(f"Bad values provided for argument. Must be int(length), float(length,decimal_places), str(max_chars_length), DateAndTimeStamp(ISO 8601), DurationStamp(ISO 8601), DateStamp(ISO 8601), own regex pattern i.e. re(my_pattern) or list. Argument: {argument}")
+    def reload(self, grammar: CommandGrammar) -> None:
+        self._grammar = grammar
+        self.logger.info("Command grammar reloaded")
     
-    def _create_pattern(self, command: str) -> str:
-        parts = command.split("^")
-        
-        result = [parts[0]]
-        
-        for part in parts[1:]:
-            if not part.startswith("<") and not part.endswith(">"):
-                raise ConfigError(
-                    f"Argument badly described in command template in config.json. Should be '<ARGUMENT_NAME>' Command: {command}"
-                )
-            argument_meta = self._arguments.get(part)
-            if argument_meta is None:
-                raise ConfigError(
-                    f"Provided argument from command is not described in arguments part in config.json. Command: {command}"
-                )
-            possible_values = self._create_possible_values(part, argument_meta)
-            to_add = rf"^{possible_values}$"
-            result.append(rf"{to_add}")
-        
-        return result
+    def _record_telemetry(self, response: str, grammar: CommandGrammar) -> None:
+        parts = response.split("^")
+        fields = grammar.numeric_fields.get((parts[0], len(parts)))
+        if fields is None:
+            return
+        timestamp = time.time()
+        for index, field in fields:
+            try:
+                value = float(parts[index])
+            except ValueError:
+                continue
+            self._telemetry.record(self.port, field, timestamp, value)
     
     def convert_to_hex(self, not_converted_message: str) -> str:
         translated = map(self._translate_to_hex, not_converted_message)
@@ -142,29 +82,18 @@ class PumpHandler:
             
         return "".join(result)
     
-    def _match_patterns(self, patterns: str, parts: str) -> bool:
-        for pattern, part in zip(patterns, parts):
-            match = re.match(pattern, part)
-            if match is None:
-                return False
-            
-        return True
-    
-    def validate_command(self, passed_command: str) -> None:
-        parts = passed_command.split("^")
-        for command in self._commands:
-            patterns = self._create_pattern(command)
-            if len(parts) != len(patterns):
-                continue
-            found = self._match_patterns(patterns, parts)
-            if found:
-                return
+    def validate_command(self, passed_command: str, grammar: CommandGrammar|None = None) -> str:
+        grammar = grammar if grammar is not None else self._grammar
+        command = grammar.match(passed_command)
+        if command is not None:
+            return command
             
         raise CommandError(f"Provided command pattern does not exist in config.json. Command: {passed_command}")
         
-    def translate_command(self, command: str) -> bytes:
-        if self.calculator is not None:
-            frame_check_sequence = self.calculator.checksum(command.encode())
+    def translate_command(self, command: str, grammar: CommandGrammar|None = None) -> bytes:
+        grammar = grammar if grammar is not None else self._grammar
+        if grammar.calculator is not None:
+            frame_check_sequence = grammar.calculator.checksum(command.encode())
             frame_check_sequence = hex(frame_check_sequence).lstrip("0x").zfill(4)
         else:
             frame_check_sequence = ""
@@ -173,13 +102,13 @@ class PumpHandler:
         response += self._packet_terminator
         return response.encode()
     
-    def _checksum_check(self, response: str) -> None:
+    def _checksum_check(self, response: str, grammar: CommandGrammar) -> None:
         parts = response.split("|")
         command = parts[0].lstrip("!")
         
         frame_check_sequence_from_response = parts[-1]
         
-        calculated_frame_check = self.calculator.checksum(command.encode())
+        calculated_frame_check = grammar.calculator.checksum(command.encode())
         calculated_frame_check = hex(calculated_frame_check).lstrip("0x").zfill(4)
         
         if calculated_frame_check != frame_check_sequence_from_response:
@@ -193,52 +122,131 @@ class PumpHandler:
         except TypeError:
             return False
 
-    def push_message(self, command: str, time_signature: int) -> None:
-        self._to_send_queue.append(MessageToSend(command, time_signature))
-        self._to_send_queue.sort(key=lambda elem: elem.time)
+    def push_message(self, command: str, time_signature: int) -> MessageToSend:
+        message_to_send = MessageToSend(command, time_signature)
+        with self._queue_condition:
+            self._to_send_queue.append(message_to_send)
+            self._to_send_queue.sort(key=lambda elem: elem.time)
+            self._queue_condition.notify()
+        return message_to_send
+        
+    def get_response(self, message_to_send: MessageToSend) -> str:
+        return message_to_send.wait_response()
+    
+    def _backoff_delay(self, attempt: int) -> float:
+        return self._backoff * self._backoff_factor ** (attempt - 1)
+    
+    def _write(self, command_to_sent: bytes) -> None:
+        try:
+            self.pump.reset_input_buffer()
+            self.pump.write(command_to_sent)
+            return
+        except serial.SerialException as exc:
+            self.logger.warning(f"Could not write to port. {exc}")
         
-    def get_response(self) -> str:
-        while len(self._response_queue) == 0:
-            ...
-        return self._response_queue.pop(0)
+        for attempt in range(1, self._retries + 2):
+            self._reopen()
+            try:
+                self.pump.reset_input_buffer()
+                self.pump.write(command_to_sent)
+                return
+            except serial.SerialException as exc:
+                self.logger.warning(f"Could not write to reopened port. Attempt {attempt}/{self._retries + 1}. {exc}")
+        raise NoResponseError("Could not write to pump after reopening port. Try again")
     
-    def _read_response(self, command_to_sent: str) -> str:
+    def _read_with_deadline(self, deadline: float) -> tuple[str, float]:
+        if self.pump.timeout != deadline:
+            self.pump.timeout = deadline
         start_time = time.time()
-        response = self.pump.read_until(self._packet_terminator.encode()).decode()
-        elapsed = time.time() - start_time
-        
-        if elapsed >= 3 and not response:
-            start_time = time.time()
-            self.pump.write(command_to_sent)
+        try:
             response = self.pump.read_until(self._packet_terminator.encode()).decode()
+        except serial.SerialException:
+            return "", deadline
+        return response, time.time() - start_time
+    
+    def _response_name(self, response: str) -> str|None:
+        if self._check_for_escape_command(response):
+            return None
+        try:
+            converted_response = self.convert_from_hex(response)
+        except (ValueError, IndexError):
+            return ""
+        return converted_response.split("|")[0].lstrip("!").split("^")[0]
+    
+    def _read_matching(self, deadline: float, response_name: str) -> tuple[str, float]:
+        start_time = time.time()
+        remaining = deadline
+        while True:
+            response, _ = self._read_with_deadline(remaining)
             elapsed = time.time() - start_time
-            if elapsed >= 3 and not response:
-                raise PumpConnectionLostError("Device disconnected")
-        elif not response:
-            raise NoResponseError("No response from pump. Try again")
+            if not response:
+                return response, elapsed
+            name = self._response_name(response)
+            if name is None or name == response_name:
+                return response, elapsed
+            self.logger.warning(f"Discarded stale reply. Expected: {response_name}. Received: {name}")
+            remaining = deadline - elapsed
+            if remaining <= 0:
+                return "", deadline
+    
+    def _reopen(self) -> None:
+        for attempt in range(1, self._reopen_attempts + 1):
+            self.logger.warning(f"Reopening port. Attempt {attempt}/{self._reopen_attempts}")
+            try:
+                self.pump.close()
+                time.sleep(self._backoff_delay(attempt))
+                self.pump.open()
+                return
+            except (serial.SerialException, OSError) as exc:
+                self.logger.warning(f"Could not reopen port. {exc}")
+        raise PumpConnectionLostError("Device disconnected")
+    
+    def _read_response(self, command_to_sent: bytes, command: str, response_name: str) -> str:
+        deadline = self._timeouts.deadline(command)
+        
+        for attempt in range(self._retries + 1):
+            if attempt > 0:
+                time.sleep(self._backoff_delay(attempt))
+                self.logger.debug(f"Resending command. Attempt {attempt}/{self._retries}")
+                self._write(command_to_sent)
+            
+            response, elapsed = self._read_matching(deadline, response_name)
+            if response:
+                self._timeouts.observe(command, elapsed)
+                return response
+            if elapsed < deadline:
+                raise NoResponseError("No response from pump. Try again")
+            deadline = min(deadline * 2, max(self._timeouts.max_timeout, deadline))
+        
+        self._reopen()
+        self._write(command_to_sent)
+        response, _ = self._read_matching(self._timeouts.max_timeout, response_name)
+        if not response:
+            raise NoResponseError("No response from pump after reopening port. Try again")
         
         return response
 
     def send_message(self, message_to_send: MessageToSend) -> None:
         self.logger.debug(f"Starting to handle message. Message: {message_to_send}")
         command = message_to_send.command
+        grammar = self._grammar
         
         self.logger.debug(f"Looking for escape command.")
         if self._check_for_escape_command(command):
-            self.pump.write(command.encode())
+            self._write(command.encode())
             return "Escape character sent. Aborting all current actions."
         
         self.logger.debug(f"Validating command.")
-        self.validate_command(command)        
+        template = self.validate_command(command, grammar)        
         
         self.logger.debug(f"Translating message. {message_to_send}")
-        command_to_sent = self.translate_command(command)
+        command_to_sent = self.translate_command(command, grammar)
 
-        self.pump.write(command_to_sent)
+        self._write(command_to_sent)
         self.logger.info(f"SENT: {command}")
         
         self.logger.debug("Waiting for response.")
-        response = self._read_response(command_to_sent)
+        response = self._read_response(command_to_sent, command, grammar.response_name(template))
         self.logger.debug("Response read.")
         
         if self._check_for_escape_command(response):
@@ -248,8 +256,10 @@ class PumpHandler:
         converted_response = self.convert_from_hex(response)
         main_response_part = converted_response.split("|")[0].lstrip("!")
         
-        if self.calculator is not None:
-            self._checksum_check(converted_response)
+        if grammar.calculator is not None:
+            self._checksum_check(converted_response, grammar)
+        if self._telemetry is not None:
+            self._record_telemetry(main_response_part, grammar)
         response = f"ACK: {main_response_part}"
         self.logger.debug(f"Finished handling message. Response: {response}")
         self.logger.info(response)
@@ -258,7 +268,12 @@ class PumpHandler:
     
     def close(self):
         self.pump.close()
-        self._kill_thread = True
+        with self._queue_condition:
+            self._kill_thread = True
+            pending, self._to_send_queue = self._to_send_queue, []
+            self._queue_condition.notify()
+        for message_to_send in pending:
+            message_to_send.answer(f"ERROR: Pump at port {self.port} is closed")
         
     def start(self):
         self._thread.start()
@@ -268,21 +283,23 @@ class PumpHandler:
         
     def _run(self):
         while True:
-            if self._kill_thread:
-                return
-            if len(self._to_send_queue) == 0:
-                continue
+            with self._queue_condition:
+                while not self._kill_thread and len(self._to_send_queue) == 0:
+                    self._queue_condition.wait()
+                if self._kill_thread:
+                    return
+                message_to_send = self._to_send_queue.pop(0)
             try:
-                response = self.send_message(self._to_send_queue.pop(0))
-                self._response_queue.append(response)
+                response = self.send_message(message_to_send)
+                message_to_send.answer(response)
             except (ChecksumError, ArgumentError, CommandError, ConfigError, NoResponseError) as exc:
-                self._response_queue.append("ERROR: " + str(exc))
+                message_to_send.answer("ERROR: " + str(exc))
             except PumpConnectionLostError as exc:
-                self._response_queue.append("ERROR: " + str(exc))
+                message_to_send.answer("ERROR: " + str(exc))
                 self._kill_thread = True
             except Exception as exc:
-                self.logger.error(traceback.print_exc())
-                self._response_queue.append("ERROR: " + str(exc))
+                self.logger.error(traceback.format_exc())
+                message_to_send.answer("ERROR: " + str(exc))
                 self._kill_thread = True
         
     def __repr__(self):
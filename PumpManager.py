@@ -0,0 +1,166 @@
+import logging
+import time
+import traceback
+
+import serial
+
+from CommandGrammar import CommandGrammar
+from Loopback import Loopback
+from PumpHandler import PumpHandler
+from ReplyStatus import ReplyStatus
+from TelemetryStore import TelemetryStore
+from exceptions.ArgumentError import ArgumentError
+from exceptions.ConfigError import ConfigError
+from exceptions.PortUsedError import PortUsedError
+from exceptions.PumpsFullError import PumpsFullError
+from exceptions.TelemetryError import TelemetryError
+
+
+class PumpManager:
+    def __init__(self, config: dict, logger: logging.Logger, max_pumps: int) -> None:
+        self._config = config
+        self._logger = logger
+        self._MAX_PUMPS = max_pumps
+        self._loopback = config['server_config'].get("loopback", False)
+
+        telemetry_config = config['server_config'].get("telemetry", {})
+        self._telemetry = TelemetryStore(
+            capacity=telemetry_config.get("capacity", 4096),
+            export_dir=telemetry_config.get("export_dir", "telemetry")
+        )
+
+        self._grammar = CommandGrammar(
+            command_set=config['pump_config']['command_set'],
+            arguments=config['pump_config']['arguments'],
+            crc_config=config['pump_config']['crc_config']
+        )
+
+        self._pumps: dict[str, PumpHandler] = {}
+
+    def ports(self) -> list[str]:
+        return list(self._pumps)
+
+    def start(self, port: str) -> list[tuple[str, int, ReplyStatus]]:
+        try:
+            if self._pumps.get(port) is not None:
+                raise PortUsedError(f"Pump is already initialized at this port. Port {port}")
+            if len(self._pumps) == self._MAX_PUMPS:
+                raise PumpsFullError(f"Max number of pumps if connected. Max number {self._MAX_PUMPS}")
+
+            if self._loopback:
+                port_handler = Loopback(
+                    port=port,
+                    crc_config=self._config['pump_config']['crc_config'],
+                    command_set=self._config['pump_config']['command_set'],
+                    arguments=self._config['pump_config']['arguments']
+                )
+            else:
+                port_handler = serial.Serial(port=port, **self._config['pump_config']['serial_port_config'])
+
+            self._pumps[port] = PumpHandler(
+                port=port,
+                pump=port_handler,
+                crc_config=self._config['pump_config']['crc_config'],
+                command_set=self._config['pump_config']['command_set'],
+                arguments=self._config['pump_config']['arguments'],
+                telemetry=self._telemetry,
+                default_timeout=self._config['pump_config']['serial_port_config'].get("timeout", 3),
+                timeout_policy=self._config['pump_config'].get("timeout_policy"),
+                retry_policy=self._config['pump_config'].get("retry_policy"),
+                grammar=self._grammar
+            )
+            self._pumps[port].start()
+            return [(f"Pump handler started for port {port}", logging.INFO, ReplyStatus.OK)]
+        except PortUsedError as exc:
+            return [(str(exc), logging.INFO, ReplyStatus.PORT_USED)]
+        except PumpsFullError as exc:
+            return [(str(exc), logging.INFO, ReplyStatus.PUMPS_FULL)]
+        except serial.SerialException as exc:
+            return [(str(exc), logging.INFO, ReplyStatus.PORT_ERROR)]
+        except Exception as exc:
+            self._logger.error(traceback.format_exc())
+            return [(str(exc), logging.ERROR, ReplyStatus.SERVER_ERROR)]
+
+    def command(self, port: str, command: str, time_signature: float) -> list[tuple[str, int, ReplyStatus]]:
+        pump_handler = self._pumps.get(port)
+        if pump_handler is None:
+            return [(f"No pump started at this port. Port {port}", logging.INFO, ReplyStatus.NO_PUMP)]
+
+        message_to_send = pump_handler.push_message(command, time_signature)
+        self._logger.debug(f"Pushed message to queue. Port {port}")
+        response = pump_handler.get_response(message_to_send)
+        self._logger.debug(f"Took response from queue. Port {port}")
+        if response.startswith("ERROR"):
+            replies = [(response, logging.ERROR, ReplyStatus.PUMP_ERROR)]
+        else:
+            replies = [(response, logging.INFO, ReplyStatus.OK)]
+
+        if pump_handler.is_killed():
+            pump_handler.close()
+            self._pumps.pop(port, None)
+            replies.append((f"Pump removed from server port mapping. Port {port}", logging.INFO, ReplyStatus.PUMP_REMOVED))
+        return replies
+
+    def close(self, port: str) -> list[tuple[str, int, ReplyStatus]]:
+        pump_handler = self._pumps.pop(port, None)
+
+        if pump_handler is not None:
+            pump_handler.close()
+            return [(f"Pump at port {port} is closed", logging.INFO, ReplyStatus.OK)]
+        return [(f"No pump initialized at port {port}", logging.INFO, ReplyStatus.NO_PUMP)]
+
+    def telemetry(self, port: str, field: str, start: float, end: float, step: float) -> list[tuple[str, int, ReplyStatus]]:
+        try:
+            buckets = self._telemetry.query(port, field, start, end, step)
+        except TelemetryError as exc:
+            return [(str(exc), logging.INFO, ReplyStatus.NOT_FOUND)]
+
+        result = ";".join(
+            f"{start:.3f},{minimum:g},{maximum:g},{mean:g},{count}" for start, minimum, maximum, mean, count in buckets
+        )
+        return [(f"TELEMETRY {port} {field}: {result}", logging.INFO, ReplyStatus.OK)]
+
+    def export(self, port: str, export_format: str) -> list[tuple[str, int, ReplyStatus]]:
+        try:
+            paths = self._telemetry.export(port, export_format)
+        except (TelemetryError, OSError) as exc:
+            return [(str(exc), logging.ERROR, ReplyStatus.SERVER_ERROR)]
+        return [(f"Telemetry exported. Port {port}. Files: {', '.join(paths)}", logging.INFO, ReplyStatus.OK)]
+
+    def reload(self, config: dict) -> list[tuple[str, int, ReplyStatus]]:
+        start_time = time.perf_counter()
+        try:
+            pump_config = config['pump_config']
+            grammar = CommandGrammar(
+                command_set=pump_config['command_set'],
+                arguments=pump_config['arguments'],
+                crc_config=pump_config['crc_config'],
+                previous=self._grammar
+            )
+        except KeyError as exc:
+            return [(f"Config not reloaded. Missing key in config.json: {exc}", logging.ERROR, ReplyStatus.BAD_REQUEST)]
+        except (ConfigError, ArgumentError) as exc:
+            return [(f"Config not reloaded. {exc}", logging.ERROR, ReplyStatus.BAD_REQUEST)]
+        except (TypeError, ValueError, AttributeError) as exc:
+            return [(f"Config not reloaded. Bad structure of pump_config in config.json: {exc}", logging.ERROR, ReplyStatus.BAD_REQUEST)]
+
+        self._grammar = grammar
+        for key in ("command_set", "arguments", "crc_config"):
+            self._config['pump_config'][key] = pump_config[key]
+        for pump_handler in list(self._pumps.values()):
+            if isinstance(pump_handler.pump, Loopback):
+                pump_handler.pump.reload(grammar.command_set, grammar.arguments, grammar.crc_config)
+            pump_handler.reload(grammar)
+
+        elapsed = (time.perf_counter() - start_time) * 1000
+        return [(
+            f"Config reloaded in {elapsed:.1f} ms. "
+            f"Commands recompiled: {len(grammar.recompiled_commands)}/{len(grammar.command_set)}. "
+            f"Arguments recompiled: {len(grammar.recompiled_arguments)}. Pumps updated: {len(self._pumps)}",
+            logging.INFO,
+            ReplyStatus.OK
+        )]
+
+    def shutdown(self) -> None:
+        for pump in list(self._pumps.values()):
+            pump.close()
@@ -0,0 +1,18 @@
+from enum import IntEnum
+
+
+class ReplyStatus(IntEnum):
+    OK = 0
+    PUMP_ERROR = 1
+    NO_PUMP = 2
+    PORT_USED = 3
+    PUMPS_FULL = 4
+    PORT_ERROR = 5
+    PUMP_REMOVED = 6
+    NOT_FOUND = 7
+    INVALID_STATE = 8
+    BAD_REQUEST = 9
+    UNKNOWN_PORT_ID = 10
+    SERVER_ERROR = 11
+    NOTICE = 12
+    REPLY_TOO_LARGE = 13
@@ -1,24 +1,27 @@
+import json
 import logging
 from multiprocessing.pool import ThreadPool
-import random
 import socket
 import re
+import threading
 import time
 import traceback
 
-import serial
-
-from Loopback import Loopback
-from PumpHandler import PumpHandler
-from exceptions.BadServerCommandEndingError import BadServerCommandEndingError
-from exceptions.PortUsedError import PortUsedError
-from exceptions.PumpsFullError import PumpsFullError
+from BinaryProtocol import BinaryProtocol, Opcode
+from ClientConnection import ClientConnection
+from ProgramScheduler import ProgramScheduler
+from ReplyStatus import ReplyStatus
+from PumpManager import PumpManager
+from ShardedPumpManager import ShardedPumpManager
+from exceptions.BadFrameError import BadFrameError
 from exceptions.ServerConnectionLostError import ServerConnectionLostError
 
 
 class Server:    
-    def __init__(self, config: dict, logger: logging.Logger) -> None:
+    def __init__(self, config: dict, logger: logging.Logger, config_path: str = "config.json") -> None:
         self.COMMAND_DELIMITER = config['server_config']['command_delimiter']
+        self.PORT = re.compile(r"((\/[a-z]+\/[a-zA-Z0-9]+)|COM\d+)$")
+        self.REQUEST_TAG = re.compile(r"#(?P<tag>\d+) (?P<message>.+)$", re.DOTALL)
         self.START_PUMP_COMMAND = re.compile(
             rf"start (?P<port>(\/[a-z]+\/[a-zA-Z0-9]+)|COM\d+){self.COMMAND_DELIMITER}$"
         )
@@ -28,159 +31,346 @@ class Server:
         self.CLOSE_PUMP_COMMAND = re.compile(
             rf"close (?P<port>(\/[a-z]+\/[a-zA-Z0-9]+)|COM\d+){self.COMMAND_DELIMITER}$"
         )
+        self.TELEMETRY_COMMAND = re.compile(
+            rf"telemetry (?P<port>(\/[a-z]+\/[a-zA-Z0-9]+)|COM\d+) (?P<field>[A-Za-z0-9_.]+) "
+            rf"(?P<start>\d+(\.\d+)?) (?P<end>\d+(\.\d+)?) (?P<step>\d+(\.\d+)?){self.COMMAND_DELIMITER}$"
+        )
+        self.EXPORT_COMMAND = re.compile(
+            rf"export (?P<port>(\/[a-z]+\/[a-zA-Z0-9]+)|COM\d+) (?P<format>csv|bin){self.COMMAND_DELIMITER}$"
+        )
+        self.PROGRAM_COMMAND = re.compile(
+            rf"program (?P<name>[A-Za-z0-9_-]+) (?P<port>(\/[a-z]+\/[a-zA-Z0-9]+)|COM\d+) (?P<steps>\S+){self.COMMAND_DELIMITER}$"
+        )
+        self.PROGRAM_CONTROL_COMMAND = re.compile(
+            rf"program_(?P<action>pause|resume|cancel|status) (?P<name>[A-Za-z0-9_-]+){self.COMMAND_DELIMITER}$"
+        )
+        self.RELOAD_COMMAND = re.compile(rf"reload{self.COMMAND_DELIMITER}$")
         
         self._logger = logger
         self._config = config
+        self._config_path = config_path
         
         self._MAX_PUMPS = config['server_config']['max_pumps']
-        self._loopback = config['server_config'].get("loopback", False)
         self._pool = ThreadPool(processes=self._MAX_PUMPS)
         
+        workers = config['server_config'].get("workers", 0)
+        self._pumps: PumpManager|ShardedPumpManager
+        if workers > 0:
+            self._pumps = ShardedPumpManager(config, logger, self._MAX_PUMPS, workers)
+        else:
+            self._pumps = PumpManager(config, logger, self._MAX_PUMPS)
+        self._programs = ProgramScheduler(logger, self._pumps.command, self._MAX_PUMPS)
+        
+        self._MAX_CLIENTS = config['server_config'].get("max_clients", 8)
+        self._connections: set[ClientConnection] = set()
+        self._connections_lock = threading.Lock()
+        
         self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self._socket.bind((config['server_config']['server_ip'], config['server_config']['port']))
         
-        self._pumps: dict[str, PumpHandler] = {}
-        self._buffer = b""
-        
         self._logger.info("Server initialized")
         
-    def handle_start_command(self, clientsocket: socket.socket, match: re.Match) -> None:
-        port = match.group("port")
+    def reply(self, connection: ClientConnection, replies: list[tuple[str, int, ReplyStatus]], tag: str|None = None) -> None:
+        if tag is None:
+            for message, level, _ in replies:
+                self.send(connection, message, level)
+            return
+        
+        lines = [(line, level) for message, level, _ in replies for line in message.split("\n")]
+        for index, (line, level) in enumerate(lines):
+            marker = "" if index == len(lines) - 1 else "+"
+            self.send(connection, f"#{tag}{marker} {line}", level)
+        
+    def handle_start_command(self, match: re.Match) -> list[tuple[str, int, ReplyStatus]]:
+        return self._pumps.start(match.group("port"))
+        
+    def handle_pump_command(self, match: re.Match, time_signature: int) -> list[tuple[str, int, ReplyStatus]]:
+        return self._pumps.command(match.group("port"), match.group("command"), time_signature)
+        
+    def handle_close_command(self, match: re.Match) -> list[tuple[str, int, ReplyStatus]]:
+        return self._pumps.close(match.group("port"))
+        
+    def handle_telemetry_command(self, match: re.Match) -> list[tuple[str, int, ReplyStatus]]:
+        return self._pumps.telemetry(
+            match.group("port"),
+            match.group("field"),
+            float(match.group("start")),
+            float(match.group("end")),
+            float(match.group("step"))
+        )
+        
+    def handle_export_command(self, match: re.Match) -> list[tuple[str, int, ReplyStatus]]:
+        return self._pumps.export(match.group("port"), match.group("format"))
+        
+    def handle_program_command(self, connection: ClientConnection, match: re.Match) -> list[tuple[str, int, ReplyStatus]]:
+        return self._programs.create(
+            match.group("name"),
+            match.group("port"),
+            match.group("steps"),
+            lambda message: self.send(connection, message)
+        )
+        
+    def handle_program_control_command(self, match: re.Match) -> list[tuple[str, int, ReplyStatus]]:
+        action = getattr(self._programs, match.group("action"))
+        return action(match.group("name"))
+        
+    def handle_reload_command(self) -> list[tuple[str, int, ReplyStatus]]:
         try:
-            if self._pumps.get(port) is not None:
-                raise PortUsedError(f"Pump is already initialized at this port. Port {port}")
-            if len(self._pumps) == self._MAX_PUMPS:
-                raise PumpsFullError(f"Max number of pumps if connected. Max number {self._MAX_PUMPS}")
-            
-            if self._loopback:
-                # time.sleep(random.uniform(0.5, 1))
-                port_handler = Loopback(
-                    port=port, 
-                    crc_config=self._config['pump_config']['crc_config'],
-                    command_set=self._config['pump_config']['command_set'], 
-                    arguments=self._config['pump_config']['arguments']
-                )
-            else:
-                port_handler = serial.Serial(port=port, **self._config['pump_config']['serial_port_config'])
-            
-            self._pumps[port] = PumpHandler(
-                port=port,
-                pump=port_handler,
-                crc_config=self._config['pump_config']['crc_config'],
-                command_set=self._config['pump_config']['command_set'],
-                arguments=self._config['pump_config']['arguments']
-            )
-            self._pumps[port].start()
-            self.send(clientsocket, f"Pump handler started for port {port}")
-        except (PortUsedError, serial.SerialException, PumpsFullError) as exc:
-            self.send(clientsocket, str(exc))
-        except Exception as exc:
-            self._logger.error(traceback.print_exc())
-            self.send(clientsocket, str(exc), logging.ERROR)
+            with open(self._config_path, "r", encoding="utf-8") as config_file:
+                config = json.load(config_file)
+        except (OSError, json.JSONDecodeError) as exc:
+            return [(f"Config not reloaded. {exc}", logging.ERROR, ReplyStatus.SERVER_ERROR)]
+        return self._pumps.reload(config)
         
-    def handle_pump_command(self, clientsocket: socket.socket, match: re.Match, time_signature: int) -> None:
-        port = match.group("port")
-        command = match.group("command")
+    def handle_reload_signal(self, *_) -> None:
+        self._pool.apply_async(self.handle_reload_command, callback=self.log_replies)
         
-        pump_handler = self._pumps.get(port)
-        if pump_handler is None:
-            self.send(clientsocket, f"No pump started at this port. Port {port}")
-            return
+    def log_replies(self, replies: list[tuple[str, int, ReplyStatus]]) -> None:
+        for message, level, _ in replies:
+            self._logger.log(level, message)
         
-        pump_handler.push_message(command, time_signature)
-        self._logger.debug(f"Pushed message to queue. Port {port}")
-        response = pump_handler.get_response()
-        self._logger.debug(f"Took response from queue. Port {port}")
-        level = logging.ERROR if "ERROR" in response else logging.INFO
-        self.send(clientsocket, response, level=level)
-        
-        if pump_handler.is_killed():
-            pump_handler.close()
-            self._pumps.pop(port)
-            self.send(clientsocket, f"Pump removed from server port mapping. Port {port}")
-        
-    def handle_close_command(self, clientsocket: socket.socket, match: re.Match) -> None:
-        port = match.group("port")
-        pump_handler = self._pumps.get(port)
-        
-        if pump_handler is not None:
-            pump_handler.close()
-            self._pumps.pop(port)
-            self.send(clientsocket, f"Pump at port {port} is closed")
-        else:
-            self.send(clientsocket, f"No pump initialized at port {port}")
+    def handle_client_request(self, connection: ClientConnection, message: str, time_signature: int) -> None:
+        try:
+            self.handle_request(connection, message, time_signature)
+        except Exception as exc:
+            self._logger.error(traceback.format_exc())
+            tagged = self.REQUEST_TAG.match(message)
+            tag = tagged.group("tag") if tagged is not None else None
+            self.reply(connection, [(f"ERROR: {exc}", logging.ERROR, ReplyStatus.SERVER_ERROR)], tag)
+        finally:
+            connection.end_request()
         
-    def handle_request(self, clientsocket: socket.socket, message: str, time_signature: int) -> None:
+    def handle_request(self, connection: ClientConnection, message: str, time_signature: int) -> None:
         self._logger.info(f"Handling message: {message}")
         
+        tag = None
+        tagged = self.REQUEST_TAG.match(message)
+        if tagged is not None:
+            tag = tagged.group("tag")
+            message = tagged.group("message")
+            
+        self.reply(connection, self.dispatch(connection, message, time_signature), tag)
+        
+    def dispatch(self, connection: ClientConnection, message: str, time_signature: int) -> list[tuple[str, int, ReplyStatus]]:
         if self.START_PUMP_COMMAND.match(message):
             match = self.START_PUMP_COMMAND.match(message)
-            self.handle_start_command(clientsocket, match)
+            replies = self.handle_start_command(match)
             
         elif self.PUMP_COMMAND.match(message):
             match = self.PUMP_COMMAND.match(message)
-            self.handle_pump_command(clientsocket, match, time_signature)
+            replies = self.handle_pump_command(match, time_signature)
             
         elif self.CLOSE_PUMP_COMMAND.match(message):
             match = self.CLOSE_PUMP_COMMAND.match(message)
-            self.handle_close_command(clientsocket, match)
+            replies = self.handle_close_command(match)
+            
+        elif self.TELEMETRY_COMMAND.match(message):
+            match = self.TELEMETRY_COMMAND.match(message)
+            replies = self.handle_telemetry_command(match)
+            
+        elif self.EXPORT_COMMAND.match(message):
+            match = self.EXPORT_COMMAND.match(message)
+            replies = self.handle_export_command(match)
+            
+        elif self.PROGRAM_COMMAND.match(message):
+            match = self.PROGRAM_COMMAND.match(message)
+            replies = self.handle_program_command(connection, match)
+            
+        elif self.PROGRAM_CONTROL_COMMAND.match(message):
+            match = self.PROGRAM_CONTROL_COMMAND.match(message)
+            replies = self.handle_program_control_command(match)
+            
+        elif self.RELOAD_COMMAND.match(message):
+            replies = self.handle_reload_command()
             
         else:
-            self.send(clientsocket, f"Unvalid message: {message}")
+            replies = [(f"Unvalid message: {message}", logging.INFO, ReplyStatus.BAD_REQUEST)]
+            
+        return replies
         
-    def run(self) -> None:
-        self._socket.listen(1)
-        clientsocket, address = self._socket.accept()
-        ack_message = f"Accepted connection from {address}. Ready to work. \nTo start at port: start PORT(i.e. /dev/ttyUSB0 or COM1)!\nTo send command: pump PORT COMMAND(see config.json)!\nTo close pump: close PORT!\nRemember that '!' is command delimiter"
-        self.send(clientsocket, ack_message)
+    def handle_binary_client_request(self, connection: ClientConnection, request_id: int, port_id: int, opcode: int, payload: bytes, time_signature: int) -> None:
+        try:
+            self.handle_binary_request(connection, request_id, port_id, opcode, payload, time_signature)
+        except Exception as exc:
+            self._logger.error(traceback.format_exc())
+            reply_payload = f"ERROR: {exc}".encode()[:BinaryProtocol.MAX_REPLY_PAYLOAD]
+            connection.send(BinaryProtocol.encode_reply(request_id, ReplyStatus.SERVER_ERROR, reply_payload))
+        finally:
+            connection.end_request()
+        
+    def handle_binary_request(self, connection: ClientConnection, request_id: int, port_id: int, opcode: int, payload: bytes, time_signature: int) -> None:
+        port = connection.port_name(port_id)
+        
+        if opcode == Opcode.START:
+            port = payload.decode()
+            if self.PORT.match(port) is None:
+                replies = [(f"Unvalid port: {port}", logging.INFO, ReplyStatus.BAD_REQUEST)]
+            else:
+                replies = self._pumps.start(port)
+        elif opcode == Opcode.TEXT:
+            replies = self.dispatch(connection, payload.decode() + self.COMMAND_DELIMITER, time_signature)
+        elif opcode not in (Opcode.PUMP, Opcode.CLOSE):
+            replies = [(f"Unknown opcode: {opcode}", logging.INFO, ReplyStatus.BAD_REQUEST)]
+        elif port is None:
+            replies = [(f"Unknown port id: {port_id}", logging.INFO, ReplyStatus.UNKNOWN_PORT_ID)]
+        elif opcode == Opcode.PUMP:
+            replies = self._pumps.command(port, payload.decode(), time_signature)
+        else:
+            replies = self._pumps.close(port)
+            
+        status = ReplyStatus.OK
+        for message, level, reply_status in replies:
+            self._logger.log(level, message)
+            if reply_status != ReplyStatus.OK:
+                status = reply_status
         
+        message = replies[0][0]
+        if opcode == Opcode.TEXT:
+            reply_payload = "\n".join(message for message, _, _ in replies).encode()
+        elif opcode == Opcode.START and status in (ReplyStatus.OK, ReplyStatus.PORT_USED):
+            port_id = connection.intern_port(port)
+            if port_id is None:
+                status = ReplyStatus.BAD_REQUEST
+                reply_payload = f"No free port ids left on this connection. Max number {ClientConnection.MAX_PORT_ID}".encode()
+            else:
+                reply_payload = BinaryProtocol.PORT_ID.pack(port_id)
+        elif status != ReplyStatus.OK:
+            reply_payload = message.encode()
+        elif message.startswith("ACK: "):
+            reply_payload = message[len("ACK: "):].encode()
+        else:
+            reply_payload = b""
+        
+        if len(reply_payload) > BinaryProtocol.MAX_REPLY_PAYLOAD:
+            status = ReplyStatus.REPLY_TOO_LARGE
+            reply_payload = f"Reply too large for binary frame. Length: {len(reply_payload)}. Max length: {BinaryProtocol.MAX_REPLY_PAYLOAD}".encode()
+        
+        if not connection.send(BinaryProtocol.encode_reply(request_id, status, reply_payload)):
+            self._logger.debug(f"Reply dropped, connection closed. Client {connection.address}")
+        
+    def run(self) -> None:
+        self._socket.listen(self._MAX_CLIENTS)
         while True:
             try:
-                message = self.receive(clientsocket)
-            except ServerConnectionLostError as exc:
-                self._logger.error(str(exc))
+                clientsocket, address = self._socket.accept()
+            except OSError:
                 break
-            except BadServerCommandEndingError as exc:
-                self.send(clientsocket, str(exc), logging.ERROR)
+            with self._connections_lock:
+                clients = len(self._connections)
+            if clients >= self._MAX_CLIENTS:
+                self._logger.info(f"Max number of clients connected. Refusing client {address}")
+                try:
+                    clientsocket.setblocking(False)
+                    clientsocket.send(f"Max number of clients connected. Max number {self._MAX_CLIENTS}\n".encode())
+                except OSError:
+                    ...
+                clientsocket.close()
                 continue
+            connection = ClientConnection(clientsocket, address, self._logger, self._config['server_config'].get("client_output", {}))
+            with self._connections_lock:
+                self._connections.add(connection)
+            threading.Thread(target=self.serve, args=(connection,), name=f"Client{address}", daemon=True).start()
+    
+    def serve(self, connection: ClientConnection) -> None:
+        ack_message = f"Accepted connection from {connection.address}. Ready to work. \nTo start at port: start PORT(i.e. /dev/ttyUSB0 or COM1)!\nTo send command: pump PORT COMMAND(see config.json)!\nTo close pump: close PORT!\nTo query telemetry: telemetry PORT FIELD FROM TO STEP!\nTo export telemetry: export PORT csv|bin!\nTo run timed program: program NAME PORT OFFSET:COMMAND;OFFSET/PERIODxCOUNT:COMMAND!\nTo control program: program_pause|program_resume|program_cancel|program_status NAME!\nTo reload command set from config.json: reload!\nPrefix a command with '#ID ' to get replies tagged with '#ID '\nTo switch to binary framing: binary!\nRemember that '!' is command delimiter"
+        self.send(connection, ack_message)
+        
+        while connection.wait_for_capacity():
+            try:
+                message = self.receive(connection)
+            except ServerConnectionLostError as exc:
+                self._logger.error(f"{exc}. Client {connection.address}")
+                break
             except Exception as exc:
-                traceback.print_exc()
+                self._logger.error(traceback.format_exc())
+                break
+            if message == f"{BinaryProtocol.NEGOTIATION_COMMAND}{self.COMMAND_DELIMITER}":
+                self.send(connection, BinaryProtocol.NEGOTIATION_REPLY)
+                connection.binary = True
+                self.serve_binary(connection)
                 break
             time_signature = time.time()
-            self._pool.apply_async(self.handle_request, [clientsocket, message, time_signature])
+            if not connection.begin_request():
+                break
+            self._pool.apply_async(self.handle_client_request, [connection, message, time_signature])
             
-        self.close()
+        connection.close()
+        with self._connections_lock:
+            self._connections.discard(connection)
     
-    def receive(self, clientsocket: socket.socket):
+    def serve_binary(self, connection: ClientConnection) -> None:
+        offset = 0
+        while connection.wait_for_capacity():
+            try:
+                frame = BinaryProtocol.split_request(connection.buffer, offset)
+            except BadFrameError as exc:
+                self._logger.error(f"{exc}. Client {connection.address}")
+                connection.send(BinaryProtocol.encode_reply(BinaryProtocol.NOTICE_REQUEST_ID, ReplyStatus.BAD_REQUEST, str(exc).encode()))
+                connection.flush(timeout=1)
+                break
+            
+            if frame is None:
+                connection.buffer = connection.buffer[offset:]
+                offset = 0
+                try:
+                    data = connection.socket.recv(65536)
+                except OSError:
+                    data = b""
+                if not data:
+                    self._logger.error(f"Connection broken. Client {connection.address}")
+                    break
+                connection.buffer += data
+                continue
+            
+            (request_id, port_id, opcode), payload, offset = frame
+            time_signature = time.time()
+            if not connection.begin_request():
+                break
+            self._pool.apply_async(
+                self.handle_binary_client_request, [connection, request_id, port_id, opcode, payload, time_signature]
+            )
+    
+    def receive(self, connection: ClientConnection):
         command_delimiter = bytes(f"{self.COMMAND_DELIMITER}", encoding="utf-8")
+        clientsocket = connection.socket
         
-        while command_delimiter not in self._buffer:
-            data = clientsocket.recv(1024)
+        while command_delimiter not in connection.buffer:
+            try:
+                data = clientsocket.recv(65536)
+            except OSError:
+                data = b""
             if not data:
                 raise ServerConnectionLostError("Connection broken")
-            data = data.strip("\n".encode())
-            if not data.endswith("!".encode()):
-                raise BadServerCommandEndingError(f"Bad server command. Message to server has to end with '!'. Received: {data.decode()}")
-            self._buffer += data
+            connection.buffer += data
             
-        line, _, self._buffer = self._buffer.partition(command_delimiter)
-        return line.decode() + self.COMMAND_DELIMITER
+        line, _, connection.buffer = connection.buffer.partition(command_delimiter)
+        return line.strip("\n".encode()).decode() + self.COMMAND_DELIMITER
             
-    def send(self, clientsocket: socket.socket, message: str, level=logging.INFO) -> None:
+    def send(self, connection: ClientConnection, message: str, level=logging.INFO) -> None:
         self._logger.log(level, message)
-        sent = clientsocket.send(f"{message}\n".encode())
-        if sent == 0:
-            self._logger.info("Connection broken")
-            self.close()
+        if connection.binary:
+            data = BinaryProtocol.encode_reply(
+                BinaryProtocol.NOTICE_REQUEST_ID, ReplyStatus.NOTICE, message.encode()[:BinaryProtocol.MAX_REPLY_PAYLOAD]
+            )
+        else:
+            data = f"{message}\n".encode()
+        if not connection.send(data):
+            self._logger.debug(f"Reply dropped, connection closed. Client {connection.address}")
             
     def close(self) -> None:
         self._logger.info("Closing server")
-        for pump in self._pumps.values():
-            pump.close()
+        self._programs.shutdown()
+        self._pumps.shutdown()
         try:
             self._socket.shutdown(socket.SHUT_RDWR)
         except OSError:
             ...
         self._socket.close()
+        with self._connections_lock:
+            connections = list(self._connections)
+        for connection in connections:
+            connection.flush(timeout=1)
+            connection.close()
         self._pool.close()
         
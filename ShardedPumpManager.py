@@ -0,0 +1,208 @@
+import itertools
+import logging
+import multiprocessing
+import sys
+import threading
+from multiprocessing.connection import Connection
+from multiprocessing.pool import ThreadPool
+
+from PumpManager import PumpManager
+from ReplyStatus import ReplyStatus
+
+
+def run_worker(connection: Connection, config: dict, index: int, max_pumps: int) -> None:
+    logger = logging.getLogger(f"Server.Worker{index}")
+    logger.setLevel(logging.DEBUG)
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+        logger.addHandler(handler)
+
+    manager = PumpManager(config, logger, max_pumps)
+    pool = ThreadPool(processes=max_pumps)
+    send_lock = threading.Lock()
+
+    def handle(request_id: int, method: str, args: tuple) -> None:
+        try:
+            replies = getattr(manager, method)(*args)
+        except Exception as exc:
+            logger.exception(exc)
+            replies = [(f"ERROR: {exc}", logging.ERROR, ReplyStatus.SERVER_ERROR)]
+        with send_lock:
+            connection.send((request_id, replies, manager.ports()))
+
+    logger.info(f"Worker {index} started")
+    while True:
+        try:
+            request_id, method, args = connection.recv()
+        except (EOFError, OSError):
+            break
+        if method == "shutdown":
+            break
+        pool.apply_async(handle, (request_id, method, args))
+
+    manager.shutdown()
+    pool.close()
+    logger.info(f"Worker {index} stopped")
+
+
+class _Worker:
+    def __init__(self, index: int) -> None:
+        self.index = index
+        self.process: multiprocessing.Process|None = None
+        self.connection: Connection|None = None
+        self.send_lock = threading.Lock()
+        self.pending: dict[int, list] = {}
+
+
+class ShardedPumpManager:
+    def __init__(self, config: dict, logger: logging.Logger, max_pumps: int, workers: int) -> None:
+        self._config = config
+        self._logger = logger
+        self._MAX_PUMPS = max_pumps
+        self._context = multiprocessing.get_context("spawn")
+        self._request_ids = itertools.count()
+        self._lock = threading.Lock()
+        self._closing = False
+
+        self._owners: dict[str, int] = {}
+        self._starting: set[str] = set()
+        self._last_owners: dict[str, int] = {}
+        self._workers = [_Worker(index) for index in range(workers)]
+        for worker in self._workers:
+            self._spawn(worker)
+
+    def _spawn(self, worker: _Worker) -> None:
+        front_connection, worker_connection = self._context.Pipe()
+        worker.connection = front_connection
+        worker.process = self._context.Process(
+            target=run_worker,
+            args=(worker_connection, self._config, worker.index, self._MAX_PUMPS),
+            name=f"PumpWorker{worker.index}",
+            daemon=True
+        )
+        worker.process.start()
+        worker_connection.close()
+        threading.Thread(
+            target=self._read_replies, args=(worker, front_connection), name=f"PumpWorker{worker.index}Reader", daemon=True
+        ).start()
+        self._logger.info(f"Pump worker {worker.index} started. PID {worker.process.pid}")
+
+    def _read_replies(self, worker: _Worker, connection: Connection) -> None:
+        while True:
+            try:
+                request_id, replies, ports = connection.recv()
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                for port, owner in list(self._owners.items()):
+                    if owner == worker.index and port not in ports and port not in self._starting:
+                        self._owners.pop(port)
+                waiter = worker.pending.pop(request_id, None)
+            if waiter is not None:
+                waiter[1] = replies
+                waiter[2] = ports
+                waiter[0].set()
+
+        with self._lock:
+            lost_ports = [port for port, owner in self._owners.items() if owner == worker.index]
+            for port in lost_ports:
+                self._owners.pop(port)
+            pending = list(worker.pending.values())
+            worker.pending.clear()
+        for waiter in pending:
+            waiter[1] = [(f"ERROR: Pump worker {worker.index} stopped", logging.ERROR, ReplyStatus.SERVER_ERROR)]
+            waiter[2] = []
+            waiter[0].set()
+
+        if self._closing:
+            return
+        self._logger.error(f"Pump worker {worker.index} crashed. Lost ports: {', '.join(lost_ports) or 'none'}")
+        worker.process.join()
+        self._spawn(worker)
+
+    def _call(self, index: int, method: str, *args) -> tuple[list[tuple[str, int, ReplyStatus]], list[str]]:
+        worker = self._workers[index]
+        waiter = [threading.Event(), None, []]
+        request_id = next(self._request_ids)
+        with self._lock:
+            worker.pending[request_id] = waiter
+        try:
+            with worker.send_lock:
+                worker.connection.send((request_id, method, args))
+        except (OSError, ValueError):
+            with self._lock:
+                worker.pending.pop(request_id, None)
+            return [(f"ERROR: Pump worker {index} is not available", logging.ERROR, ReplyStatus.SERVER_ERROR)], []
+        waiter[0].wait()
+        return waiter[1], waiter[2]
+
+    def ports(self) -> list[str]:
+        return list(self._owners)
+
+    def start(self, port: str) -> list[tuple[str, int, ReplyStatus]]:
+        with self._lock:
+            if port in self._owners:
+                return [(f"Pump is already initialized at this port. Port {port}", logging.INFO, ReplyStatus.PORT_USED)]
+            if len(self._owners) >= self._MAX_PUMPS:
+                return [(f"Max number of pumps if connected. Max number {self._MAX_PUMPS}", logging.INFO, ReplyStatus.PUMPS_FULL)]
+            load = [0] * len(self._workers)
+            for owner in self._owners.values():
+                load[owner] += 1
+            index = load.index(min(load))
+            self._owners[port] = index
+            self._last_owners[port] = index
+            self._starting.add(port)
+        replies, ports = self._call(index, "start", port)
+        with self._lock:
+            self._starting.discard(port)
+            if port not in ports and self._owners.get(port) == index:
+                self._owners.pop(port)
+        return replies
+
+    def command(self, port: str, command: str, time_signature: float) -> list[tuple[str, int, ReplyStatus]]:
+        index = self._owners.get(port)
+        if index is None:
+            return [(f"No pump started at this port. Port {port}", logging.INFO, ReplyStatus.NO_PUMP)]
+        return self._call(index, "command", port, command, time_signature)[0]
+
+    def close(self, port: str) -> list[tuple[str, int, ReplyStatus]]:
+        index = self._owners.get(port)
+        if index is None:
+            return [(f"No pump initialized at port {port}", logging.INFO, ReplyStatus.NO_PUMP)]
+        return self._call(index, "close", port)[0]
+
+    def telemetry(self, port: str, field: str, start: float, end: float, step: float) -> list[tuple[str, int, ReplyStatus]]:
+        index = self._owners.get(port, self._last_owners.get(port))
+        if index is None:
+            return [(f"No telemetry recorded for this field. Port {port}, field {field}", logging.INFO, ReplyStatus.NOT_FOUND)]
+        return self._call(index, "telemetry", port, field, start, end, step)[0]
+
+    def export(self, port: str, export_format: str) -> list[tuple[str, int, ReplyStatus]]:
+        index = self._owners.get(port, self._last_owners.get(port))
+        if index is None:
+            return [(f"No telemetry recorded for this port. Port {port}", logging.INFO, ReplyStatus.NOT_FOUND)]
+        return self._call(index, "export", port, export_format)[0]
+
+    def reload(self, config: dict) -> list[tuple[str, int, ReplyStatus]]:
+        replies = []
+        for worker in self._workers:
+            worker_replies = self._call(worker.index, "reload", config)[0]
+            replies.extend((f"Worker {worker.index}: {message}", level, status) for message, level, status in worker_replies)
+        if all(status == ReplyStatus.OK for _, _, status in replies):
+            for key in ("command_set", "arguments", "crc_config"):
+                self._config['pump_config'][key] = config['pump_config'][key]
+        return replies
+
+    def shutdown(self) -> None:
+        self._closing = True
+        for worker in self._workers:
+            try:
+                with worker.send_lock:
+                    worker.connection.send((None, "shutdown", ()))
+            except (OSError, ValueError):
+                ...
+        for worker in self._workers:
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.terminate()
@@ -0,0 +1,138 @@
+import os
+import struct
+import sys
+import threading
+from array import array
+
+from exceptions.TelemetryError import TelemetryError
+
+
+class RingBuffer:
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self._times = array("d", bytes(8 * capacity))
+        self._values = array("d", bytes(8 * capacity))
+        self._head = 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, timestamp: float, value: float) -> None:
+        with self._lock:
+            self._times[self._head] = timestamp
+            self._values[self._head] = value
+            self._head = (self._head + 1) % self.capacity
+            if self._count < self.capacity:
+                self._count += 1
+
+    def _physical_index(self, logical_index: int) -> int:
+        return (self._head - self._count + logical_index) % self.capacity
+
+    def _bisect(self, timestamp: float) -> int:
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._times[self._physical_index(middle)] < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def downsample(self, start: float, end: float, step: float) -> list[tuple[float, float, float, float, int]]:
+        if step <= 0:
+            raise TelemetryError(f"Bucket width has to be positive. Step: {step}")
+
+        buckets: dict[int, list[float]] = {}
+        with self._lock:
+            index = self._bisect(start)
+            while index < self._count:
+                physical = self._physical_index(index)
+                timestamp = self._times[physical]
+                if timestamp > end:
+                    break
+                value = self._values[physical]
+                number = int((timestamp - start) // step)
+                bucket = buckets.get(number)
+                if bucket is None:
+                    buckets[number] = [value, value, value, 1]
+                else:
+                    bucket[0] = min(bucket[0], value)
+                    bucket[1] = max(bucket[1], value)
+                    bucket[2] += value
+                    bucket[3] += 1
+                index += 1
+
+        return [
+            (start + number * step, minimum, maximum, total / count, count)
+            for number, (minimum, maximum, total, count) in sorted(buckets.items())
+        ]
+
+    def snapshot(self) -> tuple[array, array]:
+        with self._lock:
+            start = self._physical_index(0)
+            if self._count < self.capacity:
+                return self._times[start:start + self._count], self._values[start:start + self._count]
+            return self._times[start:] + self._times[:start], self._values[start:] + self._values[:start]
+
+
+class TelemetryStore:
+    BINARY_MAGIC = b"TLM1"
+
+    def __init__(self, capacity: int, export_dir: str) -> None:
+        self._capacity = capacity
+        self._export_dir = export_dir
+        self._series: dict[tuple[str, str], RingBuffer] = {}
+        self._lock = threading.Lock()
+
+    def record(self, port: str, field: str, timestamp: float, value: float) -> None:
+        series = self._series.get((port, field))
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault((port, field), RingBuffer(self._capacity))
+        series.append(timestamp, value)
+
+    def fields(self, port: str) -> list[str]:
+        return sorted(field for series_port, field in list(self._series) if series_port == port)
+
+    def query(self, port: str, field: str, start: float, end: float, step: float) -> list[tuple[float, float, float, float, int]]:
+        series = self._series.get((port, field))
+        if series is None:
+            raise TelemetryError(f"No telemetry recorded for this field. Port {port}, field {field}")
+        return series.downsample(start, end, step)
+
+    def export(self, port: str, export_format: str) -> list[str]:
+        if export_format not in ("csv", "bin"):
+            raise TelemetryError(f"Unknown export format. Must be csv or bin. Format: {export_format}")
+        fields = self.fields(port)
+        if not fields:
+            raise TelemetryError(f"No telemetry recorded for this port. Port {port}")
+
+        os.makedirs(self._export_dir, exist_ok=True)
+        port_name = port.strip("/").replace("/", "_")
+        paths = []
+        for field in fields:
+            times, values = self._series[(port, field)].snapshot()
+            path = os.path.join(self._export_dir, f"{port_name}_{field}.{export_format}")
+            if export_format == "csv":
+                self._export_csv(path, times, values)
+            else:
+                self._export_binary(path, times, values)
+            paths.append(path)
+        return paths
+
+    def _export_csv(self, path: str, times: array, values: array) -> None:
+        with open(path, "w", encoding="utf-8") as export_file:
+            export_file.write("timestamp,value\n")
+            for timestamp, value in zip(times, values):
+                export_file.write(f"{timestamp:.6f},{value!r}\n")
+
+    def _export_binary(self, path: str, times: array, values: array) -> None:
+        if sys.byteorder == "big":
+            times.byteswap()
+            values.byteswap()
+        with open(path, "wb") as export_file:
+            export_file.write(self.BINARY_MAGIC + struct.pack("<I", len(times)))
+            times.tofile(export_file)
+            values.tofile(export_file)
@@ -0,0 +1,124 @@
+import logging
+import math
+import threading
+import time
+import traceback
+from typing import Callable
+
+
+class Timer:
+    __slots__ = ("deadline", "expiry", "callback", "cancelled")
+
+    def __init__(self, deadline: float, expiry: int, callback: Callable[["Timer"], None]) -> None:
+        self.deadline = deadline
+        self.expiry = expiry
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+
+class TimerWheel:
+    def __init__(self, logger: logging.Logger, tick: float = 0.001, slots: int = 256, levels: int = 4) -> None:
+        self._logger = logger
+        self._tick = tick
+        self._slots = slots
+        self._levels = levels
+        self._wheels: list[list[list[Timer]]] = [[[] for _ in range(slots)] for _ in range(levels)]
+        self._spans = [slots ** level for level in range(levels + 1)]
+        self._count = 0
+
+        self._origin = time.monotonic()
+        self._current = 0
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread = threading.Thread(target=self._run, name="TimerWheel", daemon=True)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _insert(self, timer: Timer) -> None:
+        delta = max(timer.expiry - self._current, 1)
+        expiry = self._current + delta
+        for level in range(self._levels):
+            if delta < self._spans[level + 1]:
+                break
+        else:
+            level = self._levels - 1
+            expiry = self._current + self._spans[self._levels] - self._spans[level]
+        self._wheels[level][(expiry // self._spans[level]) % self._slots].append(timer)
+
+    def schedule(self, deadline: float, callback: Callable[[Timer], None]) -> Timer:
+        timer = Timer(deadline, math.ceil((deadline - self._origin) / self._tick), callback)
+        with self._condition:
+            self._insert(timer)
+            self._count += 1
+            self._condition.notify()
+        return timer
+
+    def _advance(self) -> list[Timer]:
+        self._current += 1
+        for level in range(self._levels - 1, 0, -1):
+            if self._current % self._spans[level] != 0:
+                continue
+            slot = self._wheels[level][(self._current // self._spans[level]) % self._slots]
+            self._wheels[level][(self._current // self._spans[level]) % self._slots] = []
+            for timer in slot:
+                if not timer.cancelled:
+                    self._insert(timer)
+                else:
+                    self._count -= 1
+
+        slot = self._wheels[0][self._current % self._slots]
+        self._wheels[0][self._current % self._slots] = []
+        expired = []
+        for timer in slot:
+            if timer.cancelled:
+                self._count -= 1
+            elif timer.expiry <= self._current:
+                self._count -= 1
+                expired.append(timer)
+            else:
+                self._insert(timer)
+        return expired
+
+    def _ticks_to_next_event(self) -> int|None:
+        if self._count == 0:
+            return None
+        until_wrap = self._slots - self._current % self._slots
+        for offset in range(1, until_wrap + 1):
+            if self._wheels[0][(self._current + offset) % self._slots]:
+                return offset
+        return until_wrap
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if not self._running:
+                    return
+                now = int((time.monotonic() - self._origin) / self._tick)
+                expired = []
+                while self._current < now:
+                    expired.extend(self._advance())
+
+                if not expired:
+                    ticks = self._ticks_to_next_event()
+                    timeout = None if ticks is None else max(0, self._origin + (self._current + ticks) * self._tick - time.monotonic())
+                    self._condition.wait(timeout)
+                    continue
+
+            for timer in expired:
+                try:
+                    timer.callback(timer)
+                except Exception:
+                    self._logger.error(traceback.format_exc())
+
+    def start(self) -> None:
+        self._running = True
+        self._thread.start()
+
+    def stop(self) -> None:
+        with self._condition:
+            self._running = False
+            self._condition.notify()
@@ -0,0 +1,112 @@
+import asyncio
+import collections
+import itertools
+import socket
+from typing import Iterable
+
+from client.ReplyAssembler import ReplyAssembler
+from exceptions.ServerConnectionLostError import ServerConnectionLostError
+
+
+class AsyncPumpClient:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, address: tuple[str, int], timeout: float|None, command_delimiter: str) -> None:
+        self.address = address
+        self._reader = reader
+        self._writer = writer
+        self._timeout = timeout
+        self._command_delimiter = command_delimiter
+
+        self._tags = itertools.count(1)
+        self._pending: dict[int, asyncio.Future] = {}
+        self._closed = False
+        self.notices: collections.deque[str] = collections.deque(maxlen=1024)
+        self._read_task = asyncio.get_running_loop().create_task(self._read_loop())
+
+    @classmethod
+    async def connect(cls, host: str = "localhost", port: int = 4000, timeout: float|None = None, command_delimiter: str = "!") -> "AsyncPumpClient":
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.get_extra_info("socket").setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return cls(reader, writer, (host, port), timeout, command_delimiter)
+
+    async def __aenter__(self) -> "AsyncPumpClient":
+        return self
+
+    async def __aexit__(self, *_) -> None:
+        await self.close()
+
+    async def _read_loop(self) -> None:
+        assembler = ReplyAssembler()
+        while True:
+            try:
+                data = await self._reader.read(65536)
+            except (OSError, asyncio.CancelledError):
+                data = b""
+            if not data:
+                break
+            for tag, text in assembler.feed(data):
+                if tag is None:
+                    self.notices.append(text)
+                    continue
+                future = self._pending.pop(tag, None)
+                if future is not None and not future.done():
+                    future.set_result(text)
+
+        self._closed = True
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(ServerConnectionLostError(f"Connection to server lost. Server {self.address}"))
+
+    def submit_many(self, frames: Iterable[str]) -> list[asyncio.Future]:
+        frames = list(frames)
+        if self._closed:
+            raise ServerConnectionLostError(f"Connection to server is closed. Server {self.address}")
+
+        loop = asyncio.get_running_loop()
+        futures = []
+        payload = []
+        for frame in frames:
+            tag = next(self._tags)
+            future = loop.create_future()
+            future.add_done_callback(lambda _, tag=tag: self._pending.pop(tag, None))
+            self._pending[tag] = future
+            futures.append(future)
+            payload.append(f"#{tag} {frame}{self._command_delimiter}")
+        self._writer.write("".join(payload).encode())
+        return futures
+
+    async def drain(self) -> None:
+        await self._writer.drain()
+
+    async def request(self, frame: str) -> str:
+        future = self.submit_many([frame])[0]
+        await self._writer.drain()
+        return await asyncio.wait_for(future, self._timeout)
+
+    async def start(self, port: str) -> str:
+        return await self.request(f"start {port}")
+
+    async def pump(self, port: str, command: str) -> str:
+        return await self.request(f"pump {port} {command}")
+
+    async def pump_many(self, commands: Iterable[tuple[str, str]]) -> list[str]:
+        futures = self.submit_many(f"pump {port} {command}" for port, command in commands)
+        await self._writer.drain()
+        return list(await asyncio.wait_for(asyncio.gather(*futures), self._timeout))
+
+    async def close_pump(self, port: str) -> str:
+        return await self.request(f"close {port}")
+
+    async def telemetry(self, port: str, field: str, start: float, end: float, step: float) -> str:
+        return await self.request(f"telemetry {port} {field} {start:.3f} {end:.3f} {step:f}")
+
+    async def export(self, port: str, export_format: str = "csv") -> str:
+        return await self.request(f"export {port} {export_format}")
+
+    async def close(self) -> None:
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except OSError:
+            ...
+        await self._read_task
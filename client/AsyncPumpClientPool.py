@@ -0,0 +1,75 @@
+import asyncio
+from typing import Iterable
+
+from client.AsyncPumpClient import AsyncPumpClient
+from exceptions.PumpNotStartedError import PumpNotStartedError
+
+
+class AsyncPumpClientPool:
+    STARTED_REPLIES = ("Pump handler started", "Pump is already initialized")
+
+    def __init__(self, clients: list[AsyncPumpClient], timeout: float|None) -> None:
+        self._timeout = timeout
+        self._clients = clients
+        self._routes: dict[str, AsyncPumpClient] = {}
+
+    @classmethod
+    async def connect(cls, addresses: Iterable[tuple[str, int]], timeout: float|None = None, command_delimiter: str = "!") -> "AsyncPumpClientPool":
+        clients = await asyncio.gather(*(
+            AsyncPumpClient.connect(host, port, timeout, command_delimiter) for host, port in addresses
+        ))
+        return cls(list(clients), timeout)
+
+    async def __aenter__(self) -> "AsyncPumpClientPool":
+        return self
+
+    async def __aexit__(self, *_) -> None:
+        await self.close()
+
+    def _route(self, port: str) -> AsyncPumpClient:
+        client = self._routes.get(port)
+        if client is None:
+            raise PumpNotStartedError(f"Pump was not started through this pool. Port {port}")
+        return client
+
+    async def start(self, port: str, address: tuple[str, int]|None = None) -> str:
+        if address is not None:
+            client = next(client for client in self._clients if client.address == address)
+        else:
+            load = {id(client): 0 for client in self._clients}
+            for routed in self._routes.values():
+                load[id(routed)] += 1
+            client = min(self._clients, key=lambda candidate: load[id(candidate)])
+        self._routes[port] = client
+
+        reply = await client.start(port)
+        if not reply.startswith(self.STARTED_REPLIES) and self._routes.get(port) is client:
+            self._routes.pop(port)
+        return reply
+
+    async def pump(self, port: str, command: str) -> str:
+        return await self._route(port).pump(port, command)
+
+    async def pump_many(self, commands: Iterable[tuple[str, str]]) -> list[str]:
+        commands = list(commands)
+        grouped: dict[int, tuple[AsyncPumpClient, list[int], list[str]]] = {}
+        for index, (port, command) in enumerate(commands):
+            client = self._route(port)
+            _, indexes, frames = grouped.setdefault(id(client), (client, [], []))
+            indexes.append(index)
+            frames.append(f"pump {port} {command}")
+
+        futures: list[asyncio.Future|None] = [None] * len(commands)
+        for client, indexes, frames in grouped.values():
+            for index, future in zip(indexes, client.submit_many(frames)):
+                futures[index] = future
+        await asyncio.gather(*(client.drain() for client, _, _ in grouped.values()))
+        return list(await asyncio.wait_for(asyncio.gather(*futures), self._timeout))
+
+    async def close_pump(self, port: str) -> str:
+        reply = await self._route(port).close_pump(port)
+        self._routes.pop(port, None)
+        return reply
+
+    async def close(self) -> None:
+        await asyncio.gather(*(client.close() for client in self._clients))
@@ -0,0 +1,161 @@
+import collections
+import itertools
+import socket
+import threading
+from concurrent.futures import Future, InvalidStateError
+from typing import Iterable
+
+from BinaryProtocol import BinaryProtocol, Opcode
+from ReplyStatus import ReplyStatus
+from client.PumpClient import PumpClient
+from exceptions.BadFrameError import BadFrameError
+from exceptions.ServerConnectionLostError import ServerConnectionLostError
+
+
+class BinaryPumpClient:
+    def __init__(self, host: str = "localhost", port: int = 4000, timeout: float|None = None, command_delimiter: str = "!") -> None:
+        self.address = (host, port)
+        self._timeout = timeout
+
+        self._socket = socket.create_connection(self.address)
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._request_ids = itertools.count(1)
+        self._pending: dict[int, Future] = {}
+        self._port_ids: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        self.notices: collections.deque[str] = collections.deque(maxlen=1024)
+
+        buffer = self._negotiate(command_delimiter)
+        self._reader = threading.Thread(target=self._read_loop, args=(buffer,), name=f"BinaryPumpClient{self.address}", daemon=True)
+        self._reader.start()
+
+    def __enter__(self) -> "BinaryPumpClient":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def _negotiate(self, command_delimiter: str) -> bytes:
+        self._socket.sendall(f"{BinaryProtocol.NEGOTIATION_COMMAND}{command_delimiter}".encode())
+        buffer = b""
+        while True:
+            while b"\n" not in buffer:
+                data = self._socket.recv(65536)
+                if not data:
+                    raise ServerConnectionLostError(f"Connection to server lost. Server {self.address}")
+                buffer += data
+            line, _, buffer = buffer.partition(b"\n")
+            if line.decode() == BinaryProtocol.NEGOTIATION_REPLY:
+                return buffer
+            self.notices.append(line.decode())
+
+    def _read_loop(self, buffer: bytes) -> None:
+        offset = 0
+        while True:
+            try:
+                frame = BinaryProtocol.split_reply(buffer, offset)
+            except BadFrameError:
+                try:
+                    self._socket.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    ...
+                break
+            if frame is None:
+                buffer = buffer[offset:]
+                offset = 0
+                try:
+                    data = self._socket.recv(65536)
+                except OSError:
+                    data = b""
+                if not data:
+                    break
+                buffer += data
+                continue
+
+            (request_id, status), payload, offset = frame
+            if request_id == BinaryProtocol.NOTICE_REQUEST_ID:
+                self.notices.append(payload.decode())
+                continue
+            with self._lock:
+                future = self._pending.pop(request_id, None)
+            if future is not None:
+                try:
+                    future.set_result((ReplyStatus(status), payload))
+                except InvalidStateError:
+                    ...
+
+        with self._lock:
+            self._closed = True
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            try:
+                future.set_exception(ServerConnectionLostError(f"Connection to server lost. Server {self.address}"))
+            except InvalidStateError:
+                ...
+
+    def _discard(self, request_id: int) -> None:
+        with self._lock:
+            self._pending.pop(request_id, None)
+
+    def submit_many(self, requests: Iterable[tuple[int, Opcode, bytes]]) -> list[Future]:
+        requests = list(requests)
+        futures = []
+        with self._lock:
+            if self._closed:
+                raise ServerConnectionLostError(f"Connection to server is closed. Server {self.address}")
+            request_ids = [next(self._request_ids) for _ in requests]
+            payload = b"".join(
+                BinaryProtocol.encode_request(request_id, port_id, opcode, body)
+                for request_id, (port_id, opcode, body) in zip(request_ids, requests)
+            )
+            for request_id in request_ids:
+                future = Future()
+                future.add_done_callback(lambda _, request_id=request_id: self._discard(request_id))
+                self._pending[request_id] = future
+                futures.append(future)
+            try:
+                self._socket.sendall(payload)
+            except OSError:
+                for request_id in request_ids:
+                    self._pending.pop(request_id, None)
+                raise
+        return futures
+
+    def request(self, port_id: int, opcode: Opcode, body: bytes = b"") -> tuple[ReplyStatus, bytes]:
+        return PumpClient.results(self.submit_many([(port_id, opcode, body)]), self._timeout)[0]
+
+    def port_id(self, port: str) -> int:
+        port_id = self._port_ids.get(port)
+        if port_id is None:
+            raise KeyError(f"Port was not started on this connection. Port {port}")
+        return port_id
+
+    def start(self, port: str) -> ReplyStatus:
+        status, payload = self.request(0, Opcode.START, port.encode())
+        if status in (ReplyStatus.OK, ReplyStatus.PORT_USED):
+            (self._port_ids[port],) = BinaryProtocol.PORT_ID.unpack(payload)
+        return status
+
+    def pump(self, port: str, command: str) -> tuple[ReplyStatus, bytes]:
+        return self.request(self.port_id(port), Opcode.PUMP, command.encode())
+
+    def pump_many(self, commands: Iterable[tuple[str, str]]) -> list[tuple[ReplyStatus, bytes]]:
+        futures = self.submit_many((self.port_id(port), Opcode.PUMP, command.encode()) for port, command in commands)
+        return PumpClient.results(futures, self._timeout)
+
+    def close_pump(self, port: str) -> ReplyStatus:
+        status, _ = self.request(self.port_id(port), Opcode.CLOSE)
+        return status
+
+    def text(self, command: str) -> tuple[ReplyStatus, str]:
+        status, payload = self.request(0, Opcode.TEXT, command.encode())
+        return status, payload.decode()
+
+    def close(self) -> None:
+        try:
+            self._socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            ...
+        self._socket.close()
+        self._reader.join()
@@ -0,0 +1,139 @@
+import collections
+import itertools
+import socket
+import threading
+from concurrent.futures import Future, InvalidStateError
+from typing import Iterable
+
+from client.ReplyAssembler import ReplyAssembler
+from exceptions.ServerConnectionLostError import ServerConnectionLostError
+
+
+class PumpClient:
+    def __init__(self, host: str = "localhost", port: int = 4000, timeout: float|None = None, command_delimiter: str = "!") -> None:
+        self.address = (host, port)
+        self._timeout = timeout
+        self._command_delimiter = command_delimiter
+
+        self._socket = socket.create_connection(self.address)
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._tags = itertools.count(1)
+        self._pending: dict[int, Future] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        self.notices: collections.deque[str] = collections.deque(maxlen=1024)
+
+        self._reader = threading.Thread(target=self._read_loop, name=f"PumpClient{self.address}", daemon=True)
+        self._reader.start()
+
+    def __enter__(self) -> "PumpClient":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def _read_loop(self) -> None:
+        assembler = ReplyAssembler()
+        while True:
+            try:
+                data = self._socket.recv(65536)
+            except OSError:
+                data = b""
+            if not data:
+                break
+            for tag, text in assembler.feed(data):
+                if tag is None:
+                    self.notices.append(text)
+                    continue
+                with self._lock:
+                    future = self._pending.pop(tag, None)
+                if future is not None:
+                    try:
+                        future.set_result(text)
+                    except InvalidStateError:
+                        ...
+
+        with self._lock:
+            self._closed = True
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            try:
+                future.set_exception(ServerConnectionLostError(f"Connection to server lost. Server {self.address}"))
+            except InvalidStateError:
+                ...
+
+    def _discard(self, tag: int) -> None:
+        with self._lock:
+            self._pending.pop(tag, None)
+
+    @staticmethod
+    def results(futures: list[Future], timeout: float|None) -> list[str]:
+        try:
+            return [future.result(timeout) for future in futures]
+        except TimeoutError:
+            for future in futures:
+                future.cancel()
+            raise
+
+    def _frame(self, tag: int, frame: str) -> str:
+        return f"#{tag} {frame}{self._command_delimiter}"
+
+    def submit_many(self, frames: Iterable[str]) -> list[Future]:
+        frames = list(frames)
+        futures = []
+        payload = []
+        with self._lock:
+            if self._closed:
+                raise ServerConnectionLostError(f"Connection to server is closed. Server {self.address}")
+            tags = []
+            for frame in frames:
+                tag = next(self._tags)
+                future = Future()
+                future.add_done_callback(lambda _, tag=tag: self._discard(tag))
+                self._pending[tag] = future
+                tags.append(tag)
+                futures.append(future)
+                payload.append(self._frame(tag, frame))
+            try:
+                self._socket.sendall("".join(payload).encode())
+            except OSError:
+                for tag in tags:
+                    self._pending.pop(tag, None)
+                raise
+        return futures
+
+    def submit(self, frame: str) -> Future:
+        return self.submit_many([frame])[0]
+
+    def request(self, frame: str) -> str:
+        return self.results([self.submit(frame)], self._timeout)[0]
+
+    def start(self, port: str) -> str:
+        return self.request(f"start {port}")
+
+    def pump(self, port: str, command: str) -> str:
+        return self.request(f"pump {port} {command}")
+
+    def submit_pump(self, port: str, command: str) -> Future:
+        return self.submit(f"pump {port} {command}")
+
+    def pump_many(self, commands: Iterable[tuple[str, str]]) -> list[str]:
+        futures = self.submit_many(f"pump {port} {command}" for port, command in commands)
+        return self.results(futures, self._timeout)
+
+    def close_pump(self, port: str) -> str:
+        return self.request(f"close {port}")
+
+    def telemetry(self, port: str, field: str, start: float, end: float, step: float) -> str:
+        return self.request(f"telemetry {port} {field} {start:.3f} {end:.3f} {step:f}")
+
+    def export(self, port: str, export_format: str = "csv") -> str:
+        return self.request(f"export {port} {export_format}")
+
+    def close(self) -> None:
+        try:
+            self._socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            ...
+        self._socket.close()
+        self._reader.join()
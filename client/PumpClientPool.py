@@ -0,0 +1,77 @@
+import threading
+from concurrent.futures import Future
+from typing import Iterable
+
+from client.PumpClient import PumpClient
+from exceptions.PumpNotStartedError import PumpNotStartedError
+
+
+class PumpClientPool:
+    STARTED_REPLIES = ("Pump handler started", "Pump is already initialized")
+
+    def __init__(self, addresses: Iterable[tuple[str, int]], timeout: float|None = None, command_delimiter: str = "!") -> None:
+        self._timeout = timeout
+        self._clients = [PumpClient(host, port, timeout, command_delimiter) for host, port in addresses]
+        self._routes: dict[str, PumpClient] = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "PumpClientPool":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def _route(self, port: str) -> PumpClient:
+        client = self._routes.get(port)
+        if client is None:
+            raise PumpNotStartedError(f"Pump was not started through this pool. Port {port}")
+        return client
+
+    def start(self, port: str, address: tuple[str, int]|None = None) -> str:
+        with self._lock:
+            if address is not None:
+                client = next(client for client in self._clients if client.address == address)
+            else:
+                load = {id(client): 0 for client in self._clients}
+                for routed in self._routes.values():
+                    load[id(routed)] += 1
+                client = min(self._clients, key=lambda candidate: load[id(candidate)])
+            self._routes[port] = client
+
+        reply = client.start(port)
+        if not reply.startswith(self.STARTED_REPLIES):
+            with self._lock:
+                if self._routes.get(port) is client:
+                    self._routes.pop(port)
+        return reply
+
+    def pump(self, port: str, command: str) -> str:
+        return self._route(port).pump(port, command)
+
+    def submit_pump(self, port: str, command: str) -> Future:
+        return self._route(port).submit_pump(port, command)
+
+    def pump_many(self, commands: Iterable[tuple[str, str]]) -> list[str]:
+        commands = list(commands)
+        grouped: dict[int, tuple[PumpClient, list[int], list[str]]] = {}
+        for index, (port, command) in enumerate(commands):
+            client = self._route(port)
+            _, indexes, frames = grouped.setdefault(id(client), (client, [], []))
+            indexes.append(index)
+            frames.append(f"pump {port} {command}")
+
+        futures: list[Future|None] = [None] * len(commands)
+        for client, indexes, frames in grouped.values():
+            for index, future in zip(indexes, client.submit_many(frames)):
+                futures[index] = future
+        return PumpClient.results(futures, self._timeout)
+
+    def close_pump(self, port: str) -> str:
+        reply = self._route(port).close_pump(port)
+        with self._lock:
+            self._routes.pop(port, None)
+        return reply
+
+    def close(self) -> None:
+        for client in self._clients:
+            client.close()
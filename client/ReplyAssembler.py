@@ -0,0 +1,27 @@
+import re
+
+
+class ReplyAssembler:
+    TAGGED_LINE = re.compile(r"#(?P<tag>\d+)(?P<more>\+)? (?P<line>.*)$", re.DOTALL)
+
+    def __init__(self) -> None:
+        self._partial: dict[int, list[str]] = {}
+        self._buffer = b""
+
+    def feed(self, data: bytes) -> list[tuple[int|None, str]]:
+        self._buffer += data
+        *lines, self._buffer = self._buffer.split(b"\n")
+
+        replies = []
+        for raw_line in lines:
+            line = raw_line.decode()
+            match = self.TAGGED_LINE.match(line)
+            if match is None:
+                replies.append((None, line))
+                continue
+            tag = int(match.group("tag"))
+            parts = self._partial.setdefault(tag, [])
+            parts.append(match.group("line"))
+            if match.group("more") is None:
+                replies.append((tag, "\n".join(self._partial.pop(tag))))
+        return replies
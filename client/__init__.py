@@ -0,0 +1,5 @@
+from client.AsyncPumpClient import AsyncPumpClient
+from client.AsyncPumpClientPool import AsyncPumpClientPool
+from client.BinaryPumpClient import BinaryPumpClient
+from client.PumpClient import PumpClient
+from client.PumpClientPool import PumpClientPool
@@ -0,0 +1,2 @@
+class BadFrameError(Exception):
+    ...
\ No newline at end of file
@@ -1,2 +0,0 @@
-class BadServerCommandEndingError(Exception):
-    ...
\ No newline at end of file
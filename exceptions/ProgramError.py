@@ -0,0 +1,2 @@
+class ProgramError(Exception):
+    ...
\ No newline at end of file
@@ -0,0 +1,2 @@
+class PumpNotStartedError(Exception):
+    ...
\ No newline at end of file
@@ -0,0 +1,2 @@
+class TelemetryError(Exception):
+    ...
\ No newline at end of file
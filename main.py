@@ -1,5 +1,6 @@
 import json
 import logging
+import signal
 import sys
 from Server import Server
 
@@ -29,9 +30,13 @@ if __name__ == "__main__":
         logger.error("No config.json file provided")
         exit(1)
     
-    server = Server(config, logger)
+    server = Server(config, logger, "config.json")
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, server.handle_reload_signal)
     try:
         server.run()
+    except KeyboardInterrupt:
+        server.close()
     except Exception as exc:
         logger.error(exc)
         server.close()
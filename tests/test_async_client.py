@@ -0,0 +1,24 @@
+import asyncio
+import time
+
+from client import AsyncPumpClient
+
+
+commands = ["INF", "ALARM", "AUDIO_QUIET", "AUDIO_VOL", "COMMS_PROTOCOL", "DISPLAY_ILLUM", "DRUG_LIB_NUMDRUGS", "DRUG_SELECT"]
+
+async def async_client():
+    async with await AsyncPumpClient.connect('localhost', 4000, timeout=10) as client:
+        print(await asyncio.gather(*(client.start(f"COM{x}") for x in range(1, 9))))
+        
+        start = time.perf_counter()
+        replies = await asyncio.gather(*(
+            client.pump(f"COM{x}", commands[(x + y - 1) % 8]) for y in range(20) for x in range(1, 9)
+        ))
+        end = time.perf_counter() - start
+        print("\n".join(replies[-8:]))
+        print(f"{len(replies)} commands in {end:10f}")
+    
+def test_async_client():
+    asyncio.run(async_client())
+    
+test_async_client()
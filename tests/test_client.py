@@ -0,0 +1,25 @@
+import time
+
+from client import PumpClient
+
+
+commands = ["INF", "ALARM", "AUDIO_QUIET", "AUDIO_VOL", "COMMS_PROTOCOL", "DISPLAY_ILLUM", "DRUG_LIB_NUMDRUGS", "DRUG_SELECT"]
+
+def test_client():
+    results = []
+    with PumpClient('localhost', 4000, timeout=10) as client:
+        for x in range(1, 9):
+            print(client.start(f"COM{x}"))
+        
+        for y in range(20):
+            start = time.perf_counter()
+            replies = client.pump_many((f"COM{x}", commands[(x + y - 1) % 8]) for x in range(1, 9))
+            results.append(time.perf_counter() - start)
+        print("\n".join(replies))
+            
+    mean = sum(results)/len(results)
+    print(f"srednia {mean:10f}")
+    print(f"max {max(results):10f}")
+    print(f"min {min(results):10f}")
+    
+test_client()
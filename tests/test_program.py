@@ -0,0 +1,18 @@
+import time
+
+from client import PumpClient
+
+
+def test_program():
+    with PumpClient('localhost', 4000, timeout=10) as client:
+        print(client.start("COM1"))
+        print(client.request("program infusion COM1 0:INF_VTBI^ACTIV^1.356^ml^STOP;0.5:INF_RATE^2.5^ml/h;0.1/0.2x5:INF"))
+        time.sleep(0.45)
+        print(client.request("program_pause infusion"))
+        time.sleep(0.5)
+        print(client.request("program_resume infusion"))
+        time.sleep(1)
+        print(client.request("program_status infusion"))
+        print("\n".join(client.notices))
+        
+test_program()
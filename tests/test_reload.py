@@ -0,0 +1,19 @@
+import time
+
+from client import PumpClient
+
+
+def test_reload():
+    with PumpClient('localhost', 4000, timeout=10) as client:
+        print(client.start("COM1"))
+        futures = [client.submit_pump("COM1", "INF") for _ in range(50)]
+        
+        start = time.perf_counter()
+        print(client.request("reload"))
+        print(f"reload {time.perf_counter() - start:10f}")
+        
+        print(f"in flight answered {sum(future.result().startswith('ACK') for future in futures)}/{len(futures)}")
+        print(client.pump("COM1", "INF"))
+        print(client.close_pump("COM1"))
+    
+test_reload()
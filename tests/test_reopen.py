@@ -0,0 +1,126 @@
+import json
+import time
+
+import serial
+
+from Loopback import Loopback
+from PumpHandler import PumpHandler
+
+
+class FlakyLoopback(Loopback):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.silent_reads = 0
+        self.late_replies = 0
+        self.failed_writes = 0
+        self.opens = 0
+        self.stale: list[bytes] = []
+        self.arriving: list[bytes] = []
+        
+    def write(self, message: bytes):
+        if self.failed_writes > 0:
+            self.failed_writes -= 1
+            raise serial.SerialException("Write failed")
+        super().write(message)
+        self.stale.extend(self.arriving)
+        self.arriving = []
+        
+    def reset_input_buffer(self) -> None:
+        self.stale = []
+        
+    def read_until(self, terminator):
+        if self.late_replies > 0:
+            self.late_replies -= 1
+            self.stale.append(self._response)
+            self._response = self._set_default_response()
+            time.sleep(self.timeout)
+            return b""
+        if self.stale:
+            return self.stale.pop(0)
+        if self.silent_reads > 0:
+            self.silent_reads -= 1
+            self._response = self._set_default_response()
+            time.sleep(self.timeout)
+            return b""
+        return super().read_until(terminator)
+    
+    def open(self) -> None:
+        self.opens += 1
+
+
+def send(pump_handler: PumpHandler, command: str) -> str:
+    message_to_send = pump_handler.push_message(command, time.time())
+    return pump_handler.get_response(message_to_send)
+
+
+def test_reopen():
+    with open("config.json", "r", encoding="utf-8") as config_file:
+        pump_config = json.load(config_file)['pump_config']
+        
+    pump = FlakyLoopback("COM1", pump_config['command_set'], pump_config['arguments'], pump_config['crc_config'])
+    pump_handler = PumpHandler(
+        port="COM1",
+        pump=pump,
+        crc_config=pump_config['crc_config'],
+        command_set=pump_config['command_set'],
+        arguments=pump_config['arguments'],
+        default_timeout=0.5,
+        timeout_policy={"min_timeout": 0.05, "max_timeout": 0.5, "min_samples": 4},
+        retry_policy={"retries": 2, "backoff": 0.01, "backoff_factor": 2, "reopen_attempts": 3}
+    )
+    pump_handler.start()
+    
+    for _ in range(8):
+        assert send(pump_handler, "INF").startswith("ACK")
+    print(f"learned deadline {pump_handler._timeouts.deadline('INF'):.3f}")
+    
+    pump.silent_reads = 1
+    start = time.perf_counter()
+    response = send(pump_handler, "INF")
+    print(f"retry: {response} ({time.perf_counter() - start:.3f}s, opens {pump.opens})")
+    assert response.startswith("ACK") and pump.opens == 0
+    
+    pump.silent_reads = 3
+    response = send(pump_handler, "INF")
+    print(f"reopen: {response} (opens {pump.opens})")
+    assert response.startswith("ACK") and pump.opens == 1
+    
+    pump.silent_reads = 10
+    response = send(pump_handler, "INF")
+    print(f"no response: {response}")
+    assert response.startswith("ERROR") and not pump_handler.is_killed()
+    
+    pump.silent_reads = 0
+    pump.failed_writes = 2
+    response = send(pump_handler, "INF")
+    print(f"write recovered: {response} (opens {pump.opens})")
+    assert response.startswith("ACK") and not pump_handler.is_killed()
+    
+    pump.failed_writes = 10
+    response = send(pump_handler, "INF")
+    print(f"write failed: {response}")
+    assert response.startswith("ERROR") and not pump_handler.is_killed()
+    
+    pump.failed_writes = 0
+    response = send(pump_handler, "INF")
+    print(f"recovered: {response}")
+    assert response.startswith("ACK")
+    
+    pump.late_replies = 1
+    response = send(pump_handler, "AUDIO_VOL")
+    print(f"late reply retried: {response}")
+    assert response.startswith("ACK: AUDIO_VOL")
+    response = send(pump_handler, "ALARM")
+    print(f"after late reply: {response}")
+    assert response.startswith("ACK: ALARM")
+    
+    other = Loopback("COM2", pump_config['command_set'], pump_config['arguments'], pump_config['crc_config'])
+    other.write(pump_handler.translate_command("AUDIO_VOL"))
+    pump.arriving = [other.read_until(b"0D")]
+    response = send(pump_handler, "ALARM")
+    print(f"stale reply discarded: {response}")
+    assert response.startswith("ACK: ALARM") and not pump.stale
+    
+    pump_handler.close()
+    
+test_reopen()
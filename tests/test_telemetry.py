@@ -0,0 +1,23 @@
+import socket
+import time
+
+
+def test_telemetry():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.connect(('localhost', 4000))
+        data = sock.recv(1024)
+        sock.sendall("start COM1!".encode())
+        data = sock.recv(1024)
+        start = time.time()
+        for _ in range(20):
+            sock.sendall("pump COM1 INF_RATE!".encode())
+            data = sock.recv(1024)
+        end = time.time()
+        sock.sendall(f"telemetry COM1 INF_RATE.InfusionRateValue {start:.3f} {end:.3f} 1!".encode())
+        data = sock.recv(8192)
+        print(data.decode())
+        sock.sendall("export COM1 csv!".encode())
+        data = sock.recv(1024)
+        print(data.decode())
+        
+test_telemetry()